@@ -0,0 +1,116 @@
+"""Measure memory and query latency of the in-memory book search index.
+
+Builds src.books.search_index.BookSearchIndex from a synthetic catalog (same
+vocabulary as benchmarks/book_search.py, no database needed), reports the
+build time and resident memory it added, then times the queries.
+
+    PYTHONPATH=. python benchmarks/search_index.py --books 1000000
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from book_search import NAMES, PUBLISHERS, SURNAMES, WORDS
+from src.books.search_index import BookSearchIndex
+
+LANGUAGES = ["English", "English", "English", "French", "German", "Spanish"]
+
+# (label, query, filters)
+CASES = [
+    ("rare term", "654321", {}),
+    ("author surname", "dickens", {}),
+    ("common word", "great", {}),
+    ("short prefix", "gr", {}),
+    ("two words", "scott fitz", {}),
+    ("three words", "great river penguin", {}),
+    ("common word + filters", "great", {
+        "language": "French", "min_pages": 200, "max_pages": 400,
+        "published_after": date(1900, 1, 1), "published_before": date(1950, 12, 31),
+    }),
+]
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * 4096
+
+
+def synthetic_books(count, rng):
+    epoch = date(1800, 1, 1)
+
+    for i in range(1, count + 1):
+        yield SimpleNamespace(
+            uid=uuid.UUID(int=rng.getrandbits(128), version=4),
+            title=" ".join(rng.choice(WORDS).title() for _ in range(3)) + f" {i}",
+            author=f"{rng.choice(NAMES).title()} {rng.choice(SURNAMES).title()}",
+            publisher=rng.choice(PUBLISHERS).title(),
+            publisher_date=epoch + timedelta(days=rng.randrange(80000)),
+            page_count=rng.randrange(50, 1000),
+            language=rng.choice(LANGUAGES),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    gc.collect()
+    baseline = rss_bytes()
+
+    index = BookSearchIndex()
+
+    started = time.perf_counter()
+
+    for book in synthetic_books(args.books, rng):
+        index.add(book)
+
+    build_seconds = time.perf_counter() - started
+
+    gc.collect()
+    size = rss_bytes() - baseline
+
+    print(f"indexed {len(index)} books in {build_seconds:.1f}s, "
+          f"{len(index._postings)} terms, "
+          f"{sum(len(p[0]) for p in index._postings.values())} postings")
+    print(f"resident memory added: {size / 2**20:.0f} MiB ({size / len(index):.0f} bytes/book)\n")
+
+    print(f"{'case':<24}{'p50':>10}{'p95':>10}{'max':>10}  (ms, {args.repeat} runs)")
+
+    for label, text, filters in CASES:
+        samples = []
+
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            index.search(text, limit=20, **filters)
+            samples.append((time.perf_counter() - started) * 1000)
+
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+        print(f"{label:<24}{statistics.median(samples):>10.2f}{p95:>10.2f}{samples[-1]:>10.2f}")
+
+    uids, cursor = index.search("great", limit=20)
+    started = time.perf_counter()
+    index.search("great", limit=20, cursor=cursor)
+    print(f"{'common word, page 2':<24}{(time.perf_counter() - started) * 1000:>10.2f}")
+
+    # Update churn: replace 10% of the catalog, which tombstones and compacts
+    started = time.perf_counter()
+    for book in synthetic_books(args.books // 10, rng):
+        index.add(book)
+        index.remove(book.uid)
+    print(f"\n{args.books // 10} adds + removes in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
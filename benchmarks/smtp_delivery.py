@@ -0,0 +1,139 @@
+"""Measure email throughput of the Celery worker's SMTP delivery paths.
+
+Starts a local aiosmtpd server that accepts and discards messages, then sends
+the same messages three ways, sequentially as one worker process would:
+
+  per message  the previous send_email: async_to_sync(FastMail.send_message),
+               a new event loop bridge and SMTP connection for every message
+  pooled       the send_email task now: src.mail.smtp_pool on the worker loop
+  batched      the send_email_batch task: send_many over one connection
+
+--rtt-ms delays every SMTP reply after the greeting (MAIL, RCPT, DATA) to
+stand in for a remote server. The stand-in has no STARTTLS or AUTH, so its
+EHLO reply is delayed by four round trips instead, for the EHLO, STARTTLS,
+second EHLO and AUTH exchanges of a real provider (TLS handshake not counted).
+
+    pip install aiosmtpd
+    PYTHONPATH=. python benchmarks/smtp_delivery.py --messages 500 --rtt-ms 5
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+from aiosmtpd.controller import Controller
+from asgiref.sync import async_to_sync
+from fastapi_mail import ConnectionConfig, FastMail
+
+from src.celery_tasks import worker_loop
+from src.mail import SMTPPool, build_email, create_message
+
+BODY = "<html><body><p>Welcome to Bookly!</p>" + "<p>Lorem ipsum dolor sit amet.</p>" * 40 + "</body></html>"
+
+
+class Sink:
+    def __init__(self, rtt: float) -> None:
+        self.rtt = rtt
+        self.received = 0
+
+    async def _wait(self, round_trips=1):
+        if self.rtt:
+            await asyncio.sleep(self.rtt * round_trips)
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await self._wait(4)
+        session.host_name = hostname
+        return responses
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        await self._wait()
+        envelope.mail_from = address
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        await self._wait()
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        await self._wait()
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def recipients(i):
+    return [f"reader{i}@example.com"]
+
+
+def per_message(port, count):
+    mail = FastMail(ConnectionConfig(
+        MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="bookly@example.com",
+        MAIL_PORT=port, MAIL_SERVER="127.0.0.1", MAIL_FROM_NAME="Bookly",
+        MAIL_STARTTLS=False, MAIL_SSL_TLS=False, USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False,
+    ))
+
+    for i in range(count):
+        async_to_sync(mail.send_message)(create_message(recipients(i), "Welcome", BODY))
+
+
+def pooled(pool, count):
+    for i in range(count):
+        worker_loop.run(pool.send(build_email(recipients(i), "Welcome", BODY)))
+
+
+def batched(pool, count, batch_size):
+    for start in range(0, count, batch_size):
+        messages = [build_email(recipients(i), "Welcome", BODY)
+                    for i in range(start, min(start + batch_size, count))]
+
+        errors = worker_loop.run(pool.send_many(messages))
+
+        assert not any(errors), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--rtt-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    sink = Sink(args.rtt_ms / 1000)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    controller = Controller(sink, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    pool = SMTPPool(hostname="127.0.0.1", port=port, username=None, password=None,
+                    start_tls=False, use_tls=False, validate_certs=False)
+
+    cases = [
+        ("per message", lambda: per_message(port, args.messages)),
+        ("pooled", lambda: pooled(pool, args.messages)),
+        (f"batched ({args.batch_size})", lambda: batched(pool, args.messages, args.batch_size)),
+    ]
+
+    print(f"{args.messages} messages, {args.rtt_ms:g} ms per SMTP reply\n")
+    print(f"{'path':<16}{'seconds':>10}{'msg/s':>10}")
+
+    try:
+        for label, run in cases:
+            received = sink.received
+            started = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - started
+
+            assert sink.received - received == args.messages
+
+            print(f"{label:<16}{seconds:>10.2f}{args.messages / seconds:>10.0f}")
+    finally:
+        worker_loop.run(pool.close())
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""add hot lookup indexes
+
+Revision ID: 3efa2e56cb2f
+Revises: 897780afd7e6
+Create Date: 2026-10-18 18:05:12.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3efa2e56cb2f'
+down_revision: Union[str, Sequence[str], None] = '897780afd7e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built CONCURRENTLY so the tables stay writable while the indexes build;
+    # that cannot run inside the migration transaction.
+    # The unique indexes fail if users/tags already contain case-insensitive
+    # duplicates; merge those first.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')],
+                        unique=True, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_tags_name_lower', 'tags', [sa.text('lower(name)')],
+                        unique=True, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_books_created_at_uid', 'books', ['created_at', 'uid'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_books_user_uid_created_at_uid', 'books', ['user_uid', 'created_at', 'uid'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_reviews_book_uid', 'reviews', ['book_uid'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reviews_book_uid', table_name='reviews',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_books_user_uid_created_at_uid', table_name='books',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_books_created_at_uid', table_name='books',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tags_name_lower', table_name='tags',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_users_email_lower', table_name='users',
+                      postgresql_concurrently=True, if_exists=True)
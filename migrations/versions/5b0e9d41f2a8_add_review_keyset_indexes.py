@@ -0,0 +1,44 @@
+"""add review keyset indexes
+
+Revision ID: 5b0e9d41f2a8
+Revises: c7ad5c72a6c5
+Create Date: 2026-10-18 19:04:26.310557
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e9d41f2a8'
+down_revision: Union[str, Sequence[str], None] = 'c7ad5c72a6c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The composite indexes lead with book_uid, so they replace
+    # ix_reviews_book_uid; it is only dropped once they exist.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reviews_book_uid_created_at_uid', 'reviews', ['book_uid', 'created_at', 'uid'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_reviews_book_uid_rating_created_at_uid', 'reviews',
+                        ['book_uid', 'rating', 'created_at', 'uid'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_reviews_book_uid', table_name='reviews',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reviews_book_uid', 'reviews', ['book_uid'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_reviews_book_uid_rating_created_at_uid', table_name='reviews',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_reviews_book_uid_created_at_uid', table_name='reviews',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,40 @@
+"""add outbox
+
+Revision ID: 7fcc5b2295ce
+Revises: e6f3b2a9c410
+Create Date: 2026-10-18 18:26:26.069992
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '7fcc5b2295ce'
+down_revision: Union[str, Sequence[str], None] = 'e6f3b2a9c410'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox',
+    sa.Column('id', sa.BIGINT(), sa.Identity(always=False), nullable=False),
+    sa.Column('task', sa.VARCHAR(), nullable=False),
+    sa.Column('args', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('attempts', sa.INTEGER(), server_default='0', nullable=False),
+    sa.Column('last_error', sa.VARCHAR(), nullable=True),
+    sa.Column('created_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('available_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_available_at_id', 'outbox', ['available_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_available_at_id', table_name='outbox')
+    op.drop_table('outbox')
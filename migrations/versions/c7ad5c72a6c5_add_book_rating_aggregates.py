@@ -0,0 +1,47 @@
+"""add book rating aggregates
+
+Revision ID: c7ad5c72a6c5
+Revises: 3efa2e56cb2f
+Create Date: 2026-10-18 18:32:47.905118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7ad5c72a6c5'
+down_revision: Union[str, Sequence[str], None] = '3efa2e56cb2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('review_count', postgresql.INTEGER(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('rating_sum', postgresql.INTEGER(), server_default='0', nullable=False))
+
+    # One-off backfill from the existing reviews; from here on the
+    # aggregates are maintained by ReviewService.
+    op.execute(
+        """
+        UPDATE books
+        SET review_count = r.review_count, rating_sum = r.rating_sum
+        FROM (
+            SELECT book_uid, count(*) AS review_count, coalesce(sum(rating), 0) AS rating_sum
+            FROM reviews
+            WHERE book_uid IS NOT NULL
+            GROUP BY book_uid
+        ) AS r
+        WHERE books.uid = r.book_uid
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'rating_sum')
+    op.drop_column('books', 'review_count')
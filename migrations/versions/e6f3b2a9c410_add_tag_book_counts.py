@@ -0,0 +1,47 @@
+"""add tag book counts
+
+Revision ID: e6f3b2a9c410
+Revises: a41c6f0d93e7
+Create Date: 2026-10-18 20:37:55.104826
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f3b2a9c410'
+down_revision: Union[str, Sequence[str], None] = 'a41c6f0d93e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tags', sa.Column('book_count', postgresql.INTEGER(), server_default='0', nullable=False))
+
+    # One-off backfill; from here on the counts are maintained with the links
+    op.execute(
+        """
+        UPDATE tags
+        SET book_count = l.book_count
+        FROM (SELECT tag_id, count(*) AS book_count FROM booktag GROUP BY tag_id) AS l
+        WHERE tags.uid = l.tag_id
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_booktag_tag_id_book_id', 'booktag', ['tag_id', 'book_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_booktag_tag_id_book_id', table_name='booktag',
+                      postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('tags', 'book_count')
@@ -1,10 +1,14 @@
 from fastapi import FastAPI, status
 from src.books.routes import book_router
 from contextlib import asynccontextmanager
-from src.db.main import init_db
+from src.db.main import async_session, init_db
+from src.books.search_index import book_search_index
+from src.auth.utils import password_hash_pool
 from src.auth.routes import auth_router
 from src.reviews.routes import review_router
 from src.tags.routes import tags_router
+from src.monitoring.routes import metrics_router, monitoring_router
+from src.metrics import mark_worker_dead
 from .errors import register_all_errors
 from .middleware import register_middleware
 
@@ -13,7 +17,12 @@ from .middleware import register_middleware
 async def life_span(app: FastAPI):
     print(f'Server is starting ...')
     await init_db()
+    if book_search_index.enabled:
+        async with async_session() as session:
+            await book_search_index.build(session)
     yield
+    password_hash_pool.shutdown()
+    mark_worker_dead()
     print(f'Server has been stopped.')
 
 version = 'v1'
@@ -27,7 +36,8 @@ app = FastAPI(
     openapi_url="/api/v1/openapi.json",
     contact={
         "email": "bookly@gmail.com"
-    }
+    },
+    lifespan=life_span
 )
 
 register_all_errors(app)
@@ -36,4 +46,6 @@ register_middleware(app)
 app.include_router(book_router, prefix=f"/api/{version}/books", tags=['books'])
 app.include_router(auth_router, prefix=f"/api/{version}/auth", tags=['auth'])
 app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=['reviews'])
-app.include_router(tags_router, prefix=f"/api/{version}/tags", tags=["tags"])
\ No newline at end of file
+app.include_router(tags_router, prefix=f"/api/{version}/tags", tags=["tags"])
+app.include_router(monitoring_router, prefix=f"/api/{version}/monitoring", tags=["monitoring"])
+app.include_router(metrics_router, tags=["monitoring"])
@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+
+from src.config import Config
+
+
+class PrincipalCache:
+    """Process-local TTL + LRU cache of verified principals keyed by token jti.
+
+    A hit means the token was recently checked against the blocklist and its
+    user loaded, so the request can skip both Redis and Postgres. Entries are
+    dropped explicitly on logout, role/verification changes and account
+    deletion in this process; other worker processes see those changes once
+    their entry expires, so keep the TTL short.
+    """
+
+    def __init__(self, ttl: float, maxsize: int) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, jti: str):
+        entry = self._entries.get(jti)
+
+        if entry is None:
+            return None
+
+        expires_at, principal = entry
+
+        if expires_at <= time.monotonic():
+            del self._entries[jti]
+            return None
+
+        self._entries.move_to_end(jti)
+
+        return principal
+
+    def set(self, jti: str, principal) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+
+        self._entries[jti] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(jti)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, jti: str) -> None:
+        self._entries.pop(jti, None)
+
+    def invalidate_user(self, user_uid) -> None:
+        user_uid = str(user_uid)
+
+        stale = [
+            jti for jti, (_, principal) in self._entries.items()
+            if str(principal.uid) == user_uid
+        ]
+
+        for jti in stale:
+            del self._entries[jti]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache(
+    ttl=Config.PRINCIPAL_CACHE_TTL,
+    maxsize=Config.PRINCIPAL_CACHE_SIZE
+)
@@ -2,22 +2,42 @@ from fastapi.security import HTTPBearer
 from fastapi import Request, status, Depends
 from fastapi.security.http import HTTPAuthorizationCredentials
 from .utils import decode_token
+from .cache import principal_cache
 from fastapi.exceptions import HTTPException
 from src.db.redis import token_in_blocklist
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.db.main import get_session
 from .service import UserService
 from typing import List, Any
-from src.db.models import User
+from .schemas import UserPrincipalModel
 from src.errors import ( InvalidToken, RevokedToken, RefreshTokenRequired, AccessTokenRequired, InsufficientPermission, AccountNotVerified)
 
 
 
 user_service = UserService()
 
+
+class AuthContext:
+    """Authentication state shared by every auth dependency of one request.
+
+    The token is decoded and checked against the blocklist once, and the
+    user is loaded at most once, no matter how many dependencies ask for it.
+    """
+
+    def __init__(self, token: str, token_data: dict) -> None:
+        self.token = token
+        self.token_data = token_data
+        self.user = None
+        self.user_loaded = False
+
+
+def get_auth_context(request: Request) -> AuthContext | None:
+    return getattr(request.state, 'auth_context', None)
+
+
 class TokenBearer(HTTPBearer):
     
-    def __ini__(self, auto_error = True):
+    def __init__(self, auto_error = True):
         super().__init__(auto_error=auto_error)
 
     async def __call__(self, request: Request) -> HTTPAuthorizationCredentials | None:
@@ -25,45 +45,32 @@ class TokenBearer(HTTPBearer):
 
         token = creds.credentials
 
-        token_data = decode_token(token)
-
-        if not self.token_valid(token):
-            # raise HTTPException(
-            #     status_code=status.HTTP_403_FORBIDDEN,
-            #     detail={
-            #         "error": "This token is invalid or expired",
-            #         "resolution": "Please get new token"
-            #     }
-            # )
-            raise InvalidToken()
-        
-        if await token_in_blocklist(token_data['jti']):
-            # raise HTTPException(
-            #     status_code=status.HTTP_403_FORBIDDEN,
-            #     detail={
-            #         "error": "This token is invalid or has been revoked",
-            #         "resolution": "Please get new token"
-            #     }
-            # )
-            raise RevokedToken()
+        context = get_auth_context(request)
 
-        
-        self.verify_token_data(token_data)
+        if context is None or context.token != token:
+            token_data = decode_token(token)
 
-        # print(creds.scheme)
+            if token_data is None:
+                raise InvalidToken()
 
-        # print(creds.credentials)
+            # A cached principal means this jti already passed the blocklist
+            # check a moment ago, so neither Redis nor Postgres is needed.
+            principal = principal_cache.get(token_data['jti'])
 
-        
+            if principal is None and await token_in_blocklist(token_data['jti']):
+                raise RevokedToken()
 
-        return token_data
-    
+            context = AuthContext(token, token_data)
 
-    def token_valid(self, token: str) -> bool:
+            if principal is not None:
+                context.user = principal
+                context.user_loaded = True
 
-        token_data = decode_token(token)
+            request.state.auth_context = context
 
-        return token_data is not None
+        self.verify_token_data(context.token_data)
+
+        return context.token_data
     
     def verify_token_data(self, token_data):
         raise NotImplementedError("Please Override this method in child classes")
@@ -92,13 +99,21 @@ class RefreshTokenBearer(TokenBearer):
             
 
 
-async def get_current_user(token_details: dict = Depends(AccessTokenBearer()),
+async def get_current_user(request: Request,
+                     token_details: dict = Depends(AccessTokenBearer()),
                      session: AsyncSession = Depends(get_session)):
-    user_email = token_details['user']['email']
+    context = get_auth_context(request)
+
+    if not context.user_loaded:
+        user_email = token_details['user']['email']
+
+        context.user = await user_service.get_principal_by_email(user_email, session)
+        context.user_loaded = True
 
-    user = await user_service.get_user_by_email(user_email, session)
+        if context.user is not None:
+            principal_cache.set(token_details['jti'], context.user)
 
-    return user
+    return context.user
 
 class RoleChecker:
     def __init__(self, allowed_roles: List[str]) -> None:
@@ -106,7 +121,7 @@ class RoleChecker:
         self.allowed_roles = allowed_roles
 
 
-    def __call__(self, current_user: User = Depends(get_current_user)) -> Any:
+    def __call__(self, current_user: UserPrincipalModel = Depends(get_current_user)) -> Any:
 
         if not current_user.is_verified:
             raise AccountNotVerified()
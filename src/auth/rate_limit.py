@@ -0,0 +1,249 @@
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from redis.exceptions import RedisError
+
+from src.config import Config
+from src.db.redis import token_blocklist
+from src.errors import RateLimitExceeded
+from src.metrics import RATE_LIMITED
+
+KEY_PREFIX = "ratelimit"
+
+
+class Rate:
+    """A token bucket: `burst` requests at once, refilled at `per_minute`"""
+
+    __slots__ = ("burst", "per_minute")
+
+    def __init__(self, burst: int, per_minute: float) -> None:
+        self.burst = burst
+        self.per_minute = per_minute
+
+    @property
+    def per_ms(self) -> float:
+        return self.per_minute / 60000
+
+
+# Per endpoint, the buckets a request draws from: one per client IP and, where
+# the body names one, one per account ("account") or per account and client
+# IP ("account_ip"). The IP buckets stop one client spraying many accounts.
+# Signup and password reset also cap each account across all clients, so a
+# distributed burst can't flood one address with emails. Login only caps
+# each client's guesses at one account: it is charged before the password is
+# checked, and an account-wide bucket would let anyone lock the owner out by
+# draining it. A login burst against one account spread over many IPs is
+# held back by the per-IP buckets alone.
+AUTH_RATE_LIMITS: Dict[str, Dict[str, Rate]] = {
+    "login": {"ip": Rate(30, 10), "account_ip": Rate(10, 2)},
+    "signup": {"ip": Rate(10, 2), "account": Rate(3, 1)},
+    "password_reset": {"ip": Rate(10, 2), "account": Rate(3, 1)},
+    "send_mail": {"ip": Rate(5, 1)},
+}
+
+# Checks and takes a token from every bucket in KEYS, atomically: either all
+# of them have a token or none is charged. ARGV holds a (burst, tokens per
+# ms) pair per key. Returns whether the request is allowed, then the limit,
+# remaining tokens and full-refill time (ms) of the tightest bucket, and the
+# wait (ms) before a retry can succeed.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+
+local levels = {}
+local retry_after = 0
+
+for i = 1, #KEYS do
+    local burst = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local level = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+
+    level = math.min(burst, level + math.max(0, now - ts) * rate)
+    levels[i] = level
+
+    if level < 1 then
+        retry_after = math.max(retry_after, math.ceil((1 - level) / rate))
+    end
+end
+
+local allowed = retry_after == 0
+local limit, remaining, reset = 0, -1, 0
+
+for i = 1, #KEYS do
+    local burst = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local level = levels[i]
+
+    if allowed then
+        level = level - 1
+    end
+
+    redis.call('HSET', KEYS[i], 'tokens', tostring(level), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[i], math.ceil(burst / rate))
+
+    if remaining < 0 or math.floor(level) < remaining then
+        limit = burst
+        remaining = math.floor(level)
+        reset = math.ceil((burst - level) / rate)
+    end
+end
+
+return {allowed and 1 or 0, limit, remaining, reset, retry_after}
+"""
+
+class RateLimitState:
+    """Outcome of a check, as RateLimit-* (draft IETF) and Retry-After headers"""
+
+    __slots__ = ("limit", "remaining", "reset", "retry_after")
+
+    def __init__(self, limit: int, remaining: int, reset: float, retry_after: float = 0) -> None:
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(max(self.remaining, 0)),
+            "RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+
+        if self.retry_after:
+            headers["Retry-After"] = str(max(math.ceil(self.retry_after), 1))
+
+        return headers
+
+
+class LocalPrefilter:
+    """Process-local per-IP token buckets checked before Redis.
+
+    Much looser than AUTH_RATE_LIMITS: it only turns away obvious floods
+    without a Redis round trip. Least recently seen IPs are forgotten past
+    `maxsize`.
+    """
+
+    def __init__(self, rate: Rate, maxsize: int) -> None:
+        self.rate = rate
+        self.maxsize = maxsize
+        self._buckets: OrderedDict = OrderedDict()
+
+    def hit(self, ip: str) -> Optional[float]:
+        """Take a token for `ip`; None if allowed, else seconds until one is available"""
+
+        now = time.monotonic()
+        burst, per_second = self.rate.burst, self.rate.per_minute / 60
+
+        level, ts = self._buckets.pop(ip, (burst, now))
+        level = min(burst, level + (now - ts) * per_second)
+
+        retry_after = None
+
+        if level >= 1:
+            level -= 1
+        else:
+            retry_after = (1 - level) / per_second
+
+        self._buckets[ip] = (level, now)
+
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+
+        return retry_after
+
+
+class AuthRateLimiter:
+    """Rate limits of the unauthenticated auth endpoints.
+
+    One atomic script call per request checks the client IP and account
+    buckets together. The client IP is `request.client.host`: behind a proxy,
+    run uvicorn with --proxy-headers and --forwarded-allow-ips so that it is
+    the real client. If Redis is unavailable, requests are let through with
+    only the local prefilter applied.
+    """
+
+    def __init__(self, enabled: bool = Config.RATE_LIMIT_ENABLED,
+                 prefilter: Optional[LocalPrefilter] = None,
+                 redis_client=token_blocklist) -> None:
+        self.enabled = enabled
+        # EVALSHA, loading the script on first use
+        self.token_bucket = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.prefilter = prefilter or LocalPrefilter(
+            Rate(Config.RATE_LIMIT_PREFILTER_BURST, Config.RATE_LIMIT_PREFILTER_PER_MINUTE),
+            Config.RATE_LIMIT_PREFILTER_SIZE,
+        )
+
+    async def check(self, request: Request, endpoint: str, account: Optional[str] = None) -> None:
+        """Take a token for this request or raise RateLimitExceeded.
+
+        The resulting RateLimit-* headers are added to the response by the
+        middleware.
+        """
+
+        if not self.enabled:
+            return
+
+        ip = request.client.host if request.client else "unknown"
+
+        retry_after = self.prefilter.hit(ip)
+
+        if retry_after is not None:
+            RATE_LIMITED.labels(endpoint, "prefilter").inc()
+
+            rate = self.prefilter.rate
+            raise RateLimitExceeded(RateLimitState(rate.burst, 0, retry_after, retry_after))
+
+        buckets = self._buckets(endpoint, ip, account)
+
+        try:
+            allowed, state = await self._take(buckets)
+        except RedisError as e:
+            logging.warning("Rate limiting skipped, Redis unavailable: %s", e)
+            return
+
+        if not allowed:
+            RATE_LIMITED.labels(endpoint, "redis").inc()
+            raise RateLimitExceeded(state)
+
+        request.state.rate_limit = state
+
+    async def _take(self, buckets: List[Tuple[str, Rate]]) -> Tuple[bool, RateLimitState]:
+        args = []
+
+        for _, rate in buckets:
+            args += [rate.burst, repr(rate.per_ms)]
+
+        allowed, limit, remaining, reset, retry_after = await self.token_bucket(
+            keys=[key for key, _ in buckets], args=args
+        )
+
+        return bool(allowed), RateLimitState(limit, remaining, reset / 1000, retry_after / 1000)
+
+    def _buckets(self, endpoint: str, ip: str, account: Optional[str]) -> List[Tuple[str, Rate]]:
+        limits = AUTH_RATE_LIMITS[endpoint]
+
+        buckets = [(f"{KEY_PREFIX}:{endpoint}:ip:{ip}", limits["ip"])]
+
+        if account is None:
+            return buckets
+
+        # Accounts are keyed by a digest, keeping addresses out of Redis
+        digest = hashlib.blake2b(account.strip().lower().encode(), digest_size=16).hexdigest()
+
+        if "account" in limits:
+            buckets.append((f"{KEY_PREFIX}:{endpoint}:account:{digest}", limits["account"]))
+
+        if "account_ip" in limits:
+            buckets.append((f"{KEY_PREFIX}:{endpoint}:account:{digest}:ip:{ip}", limits["account_ip"]))
+
+        return buckets
+
+
+auth_rate_limiter = AuthRateLimiter()
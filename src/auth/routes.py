@@ -1,20 +1,22 @@
-from fastapi import APIRouter, Depends, status, BackgroundTasks
+from fastapi import APIRouter, Depends, Request, status, BackgroundTasks
 from src.auth.schemas import UserCreateModel, UserModel, UserLoginModel, UserBooksModel, EmailModel, PasswordResetRequestModel, PasswordResetConfirmModel
 from .service import UserService
 from src.db.main import get_session
 from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi.exceptions import HTTPException
-from .utils import create_access_token, decode_token, verify_password, create_url_safe_token, decode_url_safe_token, generate_passwd_hash
+from .utils import create_access_token, decode_token, verify_password_async, create_url_safe_token, decode_url_safe_token, generate_passwd_hash_async
 from fastapi.responses import JSONResponse
 from datetime import timedelta
 from .dependencies import RefreshTokenBearer, AccessTokenBearer, get_current_user, RoleChecker
+from .rate_limit import auth_rate_limiter
 from src.db.redis import add_jti_to_blocklist
 from datetime import datetime
 from src.errors import UserAlreadyExists, UserNotFound, InvalidCredentials, InvalidToken
 from src.mail import mail, create_message
 from src.config import Config
 from src.db.main import get_session
-from src.celery_tasks import send_email
+from src.celery_tasks import queue_email
+from src.db.models import User
 
 
 
@@ -28,165 +30,37 @@ REFRESH_TOKEN_EXPIRY = 2
 
 
 @auth_router.post('/send_mail')
-async def send_mail(emails:EmailModel):
+async def send_mail(emails:EmailModel, request: Request, session: AsyncSession = Depends(get_session)):
+    await auth_rate_limiter.check(request, "send_mail")
+
     emails = emails.addresses
 
-    html = """
-    <html>
-    <head>
-        <style>
-            .container {
-                font-family: Arial, sans-serif;
-                padding: 20px;
-                background-color: #f9f9f9;
-                border: 1px solid #ddd;
-                border-radius: 8px;
-                max-width: 600px;
-                margin: auto;
-            }
-            h1 {
-                color: #2c3e50;
-            }
-            p {
-                font-size: 16px;
-                color: #333;
-            }
-            .button {
-                display: inline-block;
-                padding: 10px 20px;
-                margin-top: 20px;
-                font-size: 16px;
-                background-color: #3498db;
-                color: white;
-                text-decoration: none;
-                border-radius: 5px;
-            }
-            .footer {
-                margin-top: 30px;
-                font-size: 12px;
-                color: #888;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>📚 Welcome to Bookly!</h1>
-            <p>Thank you for joining <strong>Bookly</strong> – 
-            your go-to app for discovering and enjoying amazing books.</p>
-            
-            <p>Here's what you can do with Bookly:</p>
-            <ul>
-                <li>🔍 Explore a vast library of books</li>
-                <li>💾 Save your favorites</li>
-                <li>📝 Write reviews and connect with other readers</li>
-            </ul>
-
-            <p>We're excited to have you on board. If you ever need help, 
-            our support team is just an email away.</p>
-            
-            <a class="button" href="https://booklyapp.com" target="_blank">Start Reading</a>
-
-            <div class="footer">
-                <p>If you did not sign up for Bookly, please ignore this message.</p>
-                <p>Contact us at support@booklyapp.com</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-
-    send_email.delay(emails, "📚 Welcome to Bookly!", html)
-    
+    queue_email(session, emails, "welcome")
+
+    await session.commit()
 
     return {"message": "Email sent successfully"}
 
 @auth_router.post('/signup',  status_code=status.HTTP_201_CREATED)
-async def create_user_account(user_data: UserCreateModel, bg_tasks: BackgroundTasks, session: AsyncSession = Depends(get_session)):
+async def create_user_account(user_data: UserCreateModel, bg_tasks: BackgroundTasks, request: Request, session: AsyncSession = Depends(get_session)):
     email = user_data.email
 
+    await auth_rate_limiter.check(request, "signup", account=email)
+
     user_exists = await user_service.user_exists(email, session)
 
     if user_exists:
         raise UserAlreadyExists()
         # raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User with email already exist")
     
-    new_user = await user_service.create_user(user_data, session)
-
     token = create_url_safe_token({"email": email})
 
     link = f'http://{Config.DOMAIN}/api/v1/auth/verify/{token}'
 
-    html_message = f"""
-    <html>
-    <head>
-    <style>
-        .container {{
-            font-family: Arial, sans-serif;
-            background-color: #f4f4f4;
-            padding: 30px;
-            border-radius: 8px;
-            max-width: 600px;
-            margin: auto;
-            color: #333;
-        }}
-        .content {{
-            background-color: #ffffff;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #2c3e50;
-        }}
-        p {{
-            font-size: 16px;
-            line-height: 1.5;
-        }}
-        .button {{
-            display: inline-block;
-            padding: 12px 25px;
-            margin-top: 20px;
-            background-color: #3498db;
-            color: #fff;
-            text-decoration: none;
-            font-size: 16px;
-            border-radius: 5px;
-        }}
-        .footer {{
-            font-size: 12px;
-            color: #888;
-            margin-top: 30px;
-            text-align: center;
-        }}
-    </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="content">
-                <h1>Verify Your Email</h1>
-                <p>Hi there,</p>
-                <p>Thanks for signing up! To complete your registration, please verify your email by clicking the button below:</p>
-                
-                <a href="{link}" class="button" target="_blank">Verify Email</a>
-
-                <p>If the button doesn't work, copy and paste the following URL into your browser:</p>
-                <p><a href="{link}" target="_blank">{link}</a></p>
-            </div>
-
-            <div class="footer">
-                <p>You received this email because you signed up for Bookly.</p>
-                <p>If you didn't sign up, please ignore this message.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-"""
-    
-    emails = [email]
-
-    subject = "📚 Verify Your Email!"
+    # Committed by create_user, together with the user
+    queue_email(session, [email], "verify_email", link=link)
 
-    send_email.delay(emails, subject, html_message)
+    new_user = await user_service.create_user(user_data, session)
 
     return {
         "message": "Account Created! Check email to verify your account",
@@ -223,14 +97,17 @@ async def verify_user_account(token:str, session:AsyncSession= Depends(get_sessi
 
 
 @auth_router.post('/login')
-async def login_users(login_data: UserLoginModel, session: AsyncSession = Depends(get_session)):
+async def login_users(login_data: UserLoginModel, request: Request, session: AsyncSession = Depends(get_session)):
     email = login_data.email
     password = login_data.password
 
+    # Before any password hashing: bursts of attempts must not reach bcrypt
+    await auth_rate_limiter.check(request, "login", account=email)
+
     user = await user_service.get_user_by_email(email, session)
 
     if user is not None:
-        password_valid = verify_password(password, user.password_hash)
+        password_valid = await verify_password_async(password, user.password_hash)
 
         if password_valid:
             access_token = create_access_token(
@@ -290,8 +167,14 @@ async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer(
 
 
 @auth_router.get('/me', response_model=UserBooksModel)
-async def get_current_user(user = Depends(get_current_user),
-                           _bool=Depends(role_checker)):
+async def get_logged_in_user(current_user = Depends(get_current_user),
+                           _bool=Depends(role_checker),
+                           session: AsyncSession = Depends(get_session)):
+    # The auth dependencies only carry a principal; /me is the endpoint that
+    # actually needs the user's books and reviews.
+    user = await user_service.get_user_by_email(current_user.email, session,
+                                                load=[User.books, User.reviews])
+
     return user
 
 
@@ -318,87 +201,18 @@ async def revooke_token(token_details: dict=Depends(AccessTokenBearer())):
 """
 
 @auth_router.post('/password-reset-request')
-async def password_reset_request(email_data: PasswordResetRequestModel):
+async def password_reset_request(email_data: PasswordResetRequestModel, request: Request, session: AsyncSession = Depends(get_session)):
     email = email_data.email
 
+    await auth_rate_limiter.check(request, "password_reset", account=email)
+
     token = create_url_safe_token({"email": email})
 
     link = f'http://{Config.DOMAIN}/api/v1/auth/password-reset-confirm/{token}'
 
-    html_message = f"""
-                <html>
-                <head>
-                <style>
-                    .container {{
-                        font-family: Arial, sans-serif;
-                        background-color: #f4f4f4;
-                        padding: 30px;
-                        border-radius: 8px;
-                        max-width: 600px;
-                        margin: auto;
-                        color: #333;
-                    }}
-                    .content {{
-                        background-color: #ffffff;
-                        padding: 20px;
-                        border-radius: 8px;
-                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                    }}
-                    h1 {{
-                        color: #2c3e50;
-                    }}
-                    p {{
-                        font-size: 16px;
-                        line-height: 1.5;
-                    }}
-                    .button {{
-                        display: inline-block;
-                        padding: 12px 25px;
-                        margin-top: 20px;
-                        background-color: #e67e22;
-                        color: #fff;
-                        text-decoration: none;
-                        font-size: 16px;
-                        border-radius: 5px;
-                    }}
-                    .footer {{
-                        font-size: 12px;
-                        color: #888;
-                        margin-top: 30px;
-                        text-align: center;
-                    }}
-                </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="content">
-                            <h1>Password Reset Request</h1>
-                            <p>Hi there,</p>
-                            <p>We received a request to reset your password for your <strong>Bookly</strong> account.</p>
-                            <p>If you made this request, click the button below to reset your password:</p>
-                            
-                            <a href="{link}" class="button" target="_blank">Reset Password</a>
-
-                            <p>If the button doesn’t work, copy and paste this URL into your browser:</p>
-                            <p><a href="{link}" target="_blank">{link}</a></p>
-
-                            <p>If you didn’t request a password reset, you can safely ignore this email.</p>
-                        </div>
-
-                        <div class="footer">
-                            <p>This message was sent by Bookly • support@booklyapp.com</p>
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
-
-
-    emails = [email]
-    
-    subject = "📚 Reset Your Password"
+    queue_email(session, [email], "password_reset", link=link)
 
-    send_email.delay(emails, subject, html_message)
+    await session.commit()
 
 
     return JSONResponse(
@@ -432,7 +246,7 @@ async def reset_account_password(token:str,
         if not user:
             raise UserNotFound()
         
-        password_hash = generate_passwd_hash(new_password)
+        password_hash = await generate_passwd_hash_async(new_password)
         
         await user_service.update_user(user, {'password_hash': password_hash}, session)
 
@@ -455,8 +269,12 @@ async def delete_own_account(
     current_user = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
+    if not current_user:
+        raise UserNotFound()
+
     user = await user_service.get_user_by_email(current_user.email, session)
 
+    # The principal may be cached by a worker that missed the deletion
     if not user:
         raise UserNotFound()
 
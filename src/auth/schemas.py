@@ -25,6 +25,15 @@ class UserModel(BaseModel):
     updated_at: datetime
 
 
+class UserPrincipalModel(BaseModel):
+    """The slice of a user needed to authorize a request"""
+
+    uid: uuid.UUID
+    email: str
+    role: str
+    is_verified: bool
+
+
 class UserBooksModel(UserModel):
     books: List[Book]
     reviews: List[ReviewModel]
@@ -1,15 +1,25 @@
-from sqlmodel import select
+from sqlmodel import func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.db.models import User
+from typing import Iterable
 
-from .schemas import UserCreateModel
-from .utils import generate_passwd_hash
+from sqlalchemy import update
+
+from src.db.loading import load_options
+from src.db.models import Book, Review, User
+
+from .schemas import UserCreateModel, UserPrincipalModel
+from .utils import generate_passwd_hash_async
+from .cache import principal_cache
 
 
 class UserService:
-    async def get_user_by_email(self, email: str, session: AsyncSession):
-        statement = select(User).where(User.email == email)
+    async def get_user_by_email(self, email: str, session: AsyncSession, load: Iterable = ()):
+        statement = (
+            select(User)
+            .where(func.lower(User.email) == email.lower())
+            .options(*load_options(load))
+        )
 
         result = await session.exec(statement)
 
@@ -17,6 +27,23 @@ class UserService:
 
         return user
 
+    async def get_principal_by_email(self, email: str, session: AsyncSession):
+        """Load only the columns needed for authorization.
+
+        Selecting columns instead of the entity skips hydrating a full User
+        on every authenticated request.
+        """
+
+        statement = select(
+            User.uid, User.email, User.role, User.is_verified
+        ).where(func.lower(User.email) == email.lower())
+
+        result = await session.exec(statement)
+
+        row = result.first()
+
+        return UserPrincipalModel(**row._mapping) if row is not None else None
+
     async def user_exists(self, email, session: AsyncSession):
         user = await self.get_user_by_email(email, session)
 
@@ -27,7 +54,7 @@ class UserService:
 
         new_user = User(**user_data_dict)
 
-        new_user.password_hash = generate_passwd_hash(user_data_dict["password"])
+        new_user.password_hash = await generate_passwd_hash_async(user_data_dict["password"])
         new_user.role = "user"
 
         session.add(new_user)
@@ -44,8 +71,19 @@ class UserService:
 
         await session.commit()
 
+        if 'role' in user_data or 'is_verified' in user_data:
+            principal_cache.invalidate_user(user.uid)
+
         return user
     
     async def delete_user(self, user: User, session: AsyncSession):
+        # The user's books and reviews are kept, detached from the account
+        for model in (Book, Review):
+            await session.execute(
+                update(model).where(model.user_uid == user.uid).values(user_uid=None)
+            )
+
         await session.delete(user)
         await session.commit()
+
+        principal_cache.invalidate_user(user.uid)
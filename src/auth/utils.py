@@ -1,6 +1,10 @@
 from passlib.context import CryptContext
 from datetime import timedelta, datetime
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from src.config import Config
+from src.errors import PasswordHashingUnavailable
+from src.metrics import PASSWORD_HASH_QUEUE_DEPTH, PASSWORD_HASH_REJECTED
+import asyncio
 import jwt
 import uuid
 import logging
@@ -20,6 +24,71 @@ def generate_passwd_hash(password: str) -> str:
 def verify_password(password: str, hash: str) -> bool:
     return password_context.verify(password, hash)
 
+
+class PasswordHashPool:
+    """Runs bcrypt off the event loop on a bounded worker pool.
+
+    At most `max_pending` jobs may be queued or running at once; beyond that
+    callers get PasswordHashingUnavailable (503) straight away instead of
+    piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_pending: int, kind: str = "thread") -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="passwd-hash"
+                )
+
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHashingUnavailable()
+
+        self.pending += 1
+        PASSWORD_HASH_QUEUE_DEPTH.inc()
+
+        try:
+            loop = asyncio.get_running_loop()
+
+            return await loop.run_in_executor(self.executor, func, *args)
+
+        finally:
+            self.pending -= 1
+            PASSWORD_HASH_QUEUE_DEPTH.dec()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(
+    workers=Config.PASSWORD_HASH_WORKERS,
+    max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+    kind=Config.PASSWORD_HASH_EXECUTOR
+)
+
+
+async def generate_passwd_hash_async(password: str) -> str:
+    return await password_hash_pool.run(generate_passwd_hash, password)
+
+
+async def verify_password_async(password: str, hash: str) -> bool:
+    return await password_hash_pool.run(verify_password, password, hash)
+
 def create_access_token(user_data: dict, expiry: timedelta = None, refresh: bool=False):
     payload = {}
 
@@ -48,7 +117,7 @@ def decode_token(token: str) -> dict:
         
         return token_data
     
-    except jwt.PyJWKError as e:
+    except jwt.PyJWTError as e:
         logging.exception(e)
         return None
     
@@ -0,0 +1,136 @@
+import csv
+import json
+from typing import AsyncIterator, Iterable, Tuple
+
+from pydantic_core import to_json
+
+from src.books.schemas import Book
+from src.reviews.schemas import ReviewModel
+from src.tags.schemas import TagModel
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+
+
+def _decode(line: bytes):
+    try:
+        return line.rstrip(b"\r").decode("utf-8")
+    except UnicodeDecodeError as e:
+        return ValueError(f"invalid UTF-8 at byte {e.start}")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Split a byte stream into numbered text lines without buffering it all.
+
+    A line that is not valid UTF-8 is yielded as a ValueError instead of its
+    text, so one bad line doesn't end the stream.
+    """
+
+    remainder = b""
+    line_no = 0
+
+    async for chunk in chunks:
+        if not chunk:
+            continue
+
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+
+        for line in lines:
+            line_no += 1
+            yield line_no, _decode(line)
+
+    if remainder:
+        yield line_no + 1, _decode(remainder)
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (line number, parsed object) for each non-blank NDJSON line.
+
+    A line that is not valid JSON is yielded as the ValueError raised while
+    parsing it, so the caller can report it and carry on.
+    """
+
+    async for line_no, line in iter_lines(chunks):
+        if isinstance(line, Exception):
+            yield line_no, line
+            continue
+
+        if not line.strip():
+            continue
+
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (line number, row dict) for each CSV record after the header.
+
+    Quoted fields may span lines; a record is complete once its quotes are
+    balanced.
+    """
+
+    header = None
+    pending = []
+    start_no = 0
+
+    async for line_no, line in iter_lines(chunks):
+        if not pending:
+            start_no = line_no
+
+        if isinstance(line, Exception):
+            # The record this line belongs to is dropped with it
+            pending = []
+            yield start_no, line
+            continue
+
+        pending.append(line)
+
+        record = "\n".join(pending)
+
+        if record.count('"') % 2:
+            continue
+
+        pending = []
+
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record]))
+
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        if len(values) != len(header):
+            yield start_no, ValueError(
+                f"expected {len(header)} columns, got {len(values)}"
+            )
+            continue
+
+        yield start_no, dict(zip(header, values))
+
+    if pending:
+        yield start_no, ValueError("unterminated quoted field")
+
+
+def book_to_ndjson(book, include: Iterable[str] = ()) -> bytes:
+    """Serialize one book (and optionally its reviews/tags) as an NDJSON line"""
+
+    payload = Book.model_validate(book, from_attributes=True).model_dump()
+
+    if "reviews" in include:
+        payload["reviews"] = [
+            ReviewModel.model_validate(review, from_attributes=True).model_dump()
+            for review in book.reviews
+        ]
+
+    if "tags" in include:
+        payload["tags"] = [
+            TagModel.model_validate(tag, from_attributes=True).model_dump()
+            for tag in book.tags
+        ]
+
+    return to_json(payload) + b"\n"
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import RedisError
+
+from src.config import Config
+from src.db import redis as redis_cache
+
+BOOK_DETAIL_KEY = "book:detail:{}"
+
+# How long one process may hold the fill lock, and how long others poll for
+# its result before loading the book themselves.
+LOCK_TTL_MS = 5000
+LOCK_WAIT_SECONDS = 2.0
+LOCK_POLL_SECONDS = 0.05
+
+Loader = Callable[[], Awaitable[Optional[dict]]]
+
+
+class BookDetailCache:
+    """Read-through Redis cache of serialized BookDetailModel responses.
+
+    Entries are dicts of "body" (the JSON bytes) plus any validators the
+    loader adds, e.g. "etag" and "last_modified", stored as one Redis hash.
+
+    Misses are collapsed twice: concurrent requests in one process share a
+    single load, and across processes a short Redis lock lets one process
+    fill the entry while the others wait for it. Writers call `invalidate`
+    after committing. If Redis is unavailable the book is loaded directly.
+
+    A load runs for whichever callers are waiting on it, so the loader must
+    not use request-scoped resources such as the request's DB session.
+    """
+
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get_or_load(self, book_uid: str, loader: Loader) -> Optional[dict]:
+        key = BOOK_DETAIL_KEY.format(book_uid)
+
+        cached = await self._get(key)
+
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, loader))
+
+            self._inflight[key] = task
+
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded so one cancelled request does not cancel the shared load
+        return await asyncio.shield(task)
+
+    async def invalidate(self, book_uid) -> None:
+        try:
+            await redis_cache.cache_delete(BOOK_DETAIL_KEY.format(book_uid))
+        except (RedisError, OSError) as e:
+            logging.warning("Could not invalidate book %s in cache: %s", book_uid, e)
+
+    async def _fill(self, key: str, loader: Loader) -> Optional[dict]:
+        lock_key = f"{key}:lock"
+
+        try:
+            token = await redis_cache.acquire_lock(lock_key, LOCK_TTL_MS)
+        except (RedisError, OSError):
+            return await loader()
+
+        if token is None:
+            waited = 0.0
+
+            while waited < LOCK_WAIT_SECONDS:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                waited += LOCK_POLL_SECONDS
+
+                cached = await self._get(key)
+
+                if cached is not None:
+                    return cached
+
+        try:
+            entry = await loader()
+
+            if entry is not None:
+                await self._set(key, entry)
+
+            return entry
+
+        finally:
+            if token is not None:
+                try:
+                    await redis_cache.release_lock(lock_key, token)
+                except (RedisError, OSError):
+                    pass
+
+    async def _get(self, key: str) -> Optional[dict]:
+        try:
+            entry = await redis_cache.cache_get_entry(key)
+        except (RedisError, OSError) as e:
+            logging.warning("Could not read %s from cache: %s", key, e)
+            return None
+
+        if entry is None:
+            return None
+
+        # Everything but the body is text, like what the loader returned
+        return {k: v if k == "body" else v.decode() for k, v in entry.items()}
+
+    async def _set(self, key: str, entry: dict) -> None:
+        try:
+            await redis_cache.cache_set_entry(key, entry, self.ttl)
+        except (RedisError, OSError) as e:
+            logging.warning("Could not store %s in cache: %s", key, e)
+
+
+book_detail_cache = BookDetailCache(ttl=Config.BOOK_CACHE_TTL)
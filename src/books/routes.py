@@ -1,42 +1,100 @@
-from fastapi import APIRouter, FastAPI,status, Depends
+from fastapi import APIRouter, FastAPI,status, Depends, Query, Request
 from fastapi.exceptions import HTTPException
+from fastapi.responses import Response, StreamingResponse
 from src.books.book_data import books
-from src.books.schemas import Book, BookUpdateModel, BookCreateModel, BookDetailModel
+from src.books.schemas import Book, BookUpdateModel, BookCreateModel, BookDetailModel, BookPageModel, BookImportReportModel, BookBatchGetModel, BookBatchModel
+from src.books.cache import book_detail_cache
+from src.books.bulk import CSV_MEDIA_TYPES, NDJSON_MEDIA_TYPES, iter_csv_rows, iter_ndjson_rows
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.books.service import BookService
-from typing import List
-from src.db.main import get_session
+from typing import List, Literal, Optional
+from datetime import date
+import uuid
+from src.db.main import async_session, get_session
 from src.auth.dependencies import AccessTokenBearer, RoleChecker
-from src.errors import BookNotFound
+from src.config import Config
+from src.errors import BookNotFound, UnsupportedImportFormat
+from src.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page
+from src.conditional import content_etag, http_date, is_not_modified, make_etag, not_modified_response, set_validators
 
 book_router = APIRouter()
 book_service = BookService()
 access_token_bearer = AccessTokenBearer()
 role_checker = Depends(RoleChecker(['admin', 'user']))
 
+# Most tags one GET /books can filter on
+MAX_TAG_FILTERS = 10
 
 
-@book_router.get('/', response_model=List[Book], dependencies=[role_checker])
-async def get_all_books(session: AsyncSession = Depends(get_session), 
+
+def book_page_response(request: Request, response: Response, page: Page):
+    # Validated on the page's (uid, updated_at) pairs, before serializing it.
+    # Lists carry no Last-Modified: a deleted book would not move it.
+    etag = make_etag([page.next_cursor, *((book.uid, book.updated_at) for book in page.items)])
+
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    set_validators(response, etag)
+
+    return {"books": page.items, "next_cursor": page.next_cursor}
+
+
+@book_router.get('/', response_model=BookPageModel, dependencies=[role_checker])
+async def get_all_books(request: Request, response: Response,
+                        session: AsyncSession = Depends(get_session), 
                         user_details=Depends(access_token_bearer),
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        cursor: Optional[str] = None,
+                        tag: List[str] = Query([], max_length=MAX_TAG_FILTERS),
+                        tag_mode: Literal['all', 'any'] = 'all',
                         ):
-    print(user_details)
-    books = await book_service.get_all_books(session)
-    return books
+    page = await book_service.get_all_books(session, limit=limit, cursor=cursor,
+                                            tags=tag, tag_mode=tag_mode)
+    return book_page_response(request, response, page)
 # http://127.0.0.1:8000/books
+# http://127.0.0.1:8000/books?limit=50&cursor=<next_cursor of the previous page>
+# http://127.0.0.1:8000/api/v1/books?tag=fantasy&tag=classic&tag_mode=any
 
-@book_router.get('/user/{user_uid}', response_model=List[Book], dependencies=[role_checker])
+@book_router.get('/user/{user_uid}', response_model=BookPageModel, dependencies=[role_checker])
 async def get_user_book_submissions(
                         user_uid: str,
+                        request: Request, response: Response,
                         session: AsyncSession = Depends(get_session), 
                         user_details=Depends(access_token_bearer),
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        cursor: Optional[str] = None,
                         ):
-    print(user_details)
-    books = await book_service.get_user_books(user_uid, session)
-    return books
+    page = await book_service.get_user_books(user_uid, session, limit=limit, cursor=cursor)
+    return book_page_response(request, response, page)
 # http://127.0.0.1:8000/api/v1/books/user/2899d9e9-d03f-4656-8aef-3ad92d3c96ae
 
 
+@book_router.get('/search', response_model=BookPageModel, dependencies=[role_checker])
+async def search_books(
+                        request: Request, response: Response,
+                        q: str = Query(min_length=1, max_length=200),
+                        language: Optional[str] = None,
+                        min_pages: Optional[int] = Query(None, ge=0),
+                        max_pages: Optional[int] = Query(None, ge=0),
+                        published_after: Optional[date] = None,
+                        published_before: Optional[date] = None,
+                        session: AsyncSession = Depends(get_session),
+                        user_details=Depends(access_token_bearer),
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        cursor: Optional[str] = None,
+                        ):
+    page = await book_service.search_books(
+        q, session,
+        language=language,
+        min_pages=min_pages, max_pages=max_pages,
+        published_after=published_after, published_before=published_before,
+        limit=limit, cursor=cursor,
+    )
+    return book_page_response(request, response, page)
+# http://127.0.0.1:8000/api/v1/books/search?q=great gat&language=English&min_pages=100
+
+
 @book_router.post('/', status_code=status.HTTP_201_CREATED, response_model=Book, dependencies=[role_checker])
 async def create_a_book(book_data: BookCreateModel, session: AsyncSession = Depends(get_session), 
                         token_details=Depends(access_token_bearer)) -> dict:
@@ -56,17 +114,107 @@ async def create_a_book(book_data: BookCreateModel, session: AsyncSession = Depe
 }
 """
 
+@book_router.post('/import', response_model=BookImportReportModel, dependencies=[role_checker])
+async def import_books(request: Request,
+                       session: AsyncSession = Depends(get_session),
+                       token_details=Depends(access_token_bearer),
+                       batch_size: int = Query(Config.BOOK_IMPORT_BATCH_SIZE, ge=1, le=10000)):
+    media_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+
+    if media_type in NDJSON_MEDIA_TYPES:
+        rows = iter_ndjson_rows(request.stream())
+    elif media_type in CSV_MEDIA_TYPES:
+        rows = iter_csv_rows(request.stream())
+    else:
+        raise UnsupportedImportFormat()
+
+    user_id = token_details.get('user')['user_uid']
+
+    return await book_service.import_books(rows, user_id, session, batch_size=batch_size)
+# curl -X POST -H 'Content-Type: application/x-ndjson' --data-binary @books.ndjson \
+#      http://127.0.0.1:8000/api/v1/books/import?batch_size=2000
+
+
+@book_router.get('/export', response_class=StreamingResponse, dependencies=[role_checker])
+async def export_books(token_details=Depends(access_token_bearer),
+                       include: List[Literal['reviews', 'tags']] = Query([])):
+
+    # The export outlives the request-scoped session, so it opens its own.
+    async def stream():
+        async with async_session() as session:
+            async for chunk in book_service.export_books(
+                session, include, chunk_size=Config.BOOK_EXPORT_CHUNK_SIZE
+            ):
+                yield chunk
+
+    return StreamingResponse(stream(), media_type='application/x-ndjson')
+# http://127.0.0.1:8000/api/v1/books/export?include=reviews&include=tags
+
+
+@book_router.post('/batch-get', response_model=BookBatchModel, dependencies=[role_checker])
+async def batch_get_books(request_data: BookBatchGetModel, session: AsyncSession = Depends(get_session),
+                          token_details: dict=Depends(access_token_bearer)) -> dict:
+   books, missing = await book_service.get_books_by_uids(
+      request_data.uids, session,
+      include=request_data.include,
+      reviews_limit=request_data.reviews_limit,
+   )
+
+   return {"books": books, "missing": missing}
+"""
+    {
+    "uids": ["7b0f...", "c4e1..."],
+    "include": ["tags"]
+    }
+"""
+
+
 @book_router.get('/{book_uid}', response_model=BookDetailModel, dependencies=[role_checker])
-async def get_book(book_uid: str, session: AsyncSession = Depends(get_session),
-                   token_details: dict=Depends(access_token_bearer)) -> dict:
-   book = await book_service.get_book(book_uid, session)
+async def get_book(book_uid: uuid.UUID, request: Request, session: AsyncSession = Depends(get_session),
+                   token_details: dict=Depends(access_token_bearer),
+                   reviews_limit: int = Query(Config.BOOK_DETAIL_REVIEWS_LIMIT, ge=0, le=MAX_PAGE_SIZE)) -> dict:
+
+   async def load_book(session: AsyncSession):
+      book = await book_service.get_book_detail(book_uid, session, reviews_limit=reviews_limit)
 
-   if book:
-    return book
+      if book is None:
+         return None
+
+      body = book.model_dump_json().encode()
+
+      return {
+         "body": body,
+         "etag": content_etag(body),
+         "last_modified": http_date(book.updated_at),
+      }
+
+   # Served as the cached JSON bytes, skipping response model validation.
+   # Only the default shape is cached, so invalidation stays a single key.
+   if reviews_limit == Config.BOOK_DETAIL_REVIEWS_LIMIT:
+      # The load is shared with concurrent requests and may outlive this one,
+      # so it opens its own session rather than using the request's.
+      async def load_shared():
+         async with async_session() as own_session:
+            return await load_book(own_session)
+
+      # Keyed by the canonical uid, the spelling invalidate() deletes
+      entry = await book_detail_cache.get_or_load(str(book_uid), load_shared)
    else:
+      entry = await load_book(session)
+
+   if entry is None:
       # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, 
       #                   detail='Book Not Found')
       raise BookNotFound()
+
+   if is_not_modified(request, entry['etag'], entry['last_modified']):
+      return not_modified_response(entry['etag'], entry['last_modified'])
+
+   response = Response(content=entry['body'], media_type='application/json')
+
+   set_validators(response, entry['etag'], entry['last_modified'])
+
+   return response
 # 
 
 @book_router.patch('/{book_uid}', response_model=Book, dependencies=[role_checker])
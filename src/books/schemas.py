@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field
 from datetime import datetime, date
 import uuid
-from typing import List
+from typing import List, Literal, Optional
+from src.config import Config
 from src.reviews.schemas import ReviewModel
 from src.tags.schemas import TagModel
 
@@ -14,21 +15,62 @@ class Book(BaseModel):
     publisher_date: date
     page_count: int
     language: str
+    review_count: int = 0
+    rating_sum: int = Field(default=0, exclude=True)
     created_at: datetime
     updated_at: datetime
 
+    @computed_field
+    @property
+    def avg_rating(self) -> Optional[float]:
+        if not self.review_count:
+            return None
+
+        return round(self.rating_sum / self.review_count, 2)
+
+
+class BookPageModel(BaseModel):
+    books: List[Book]
+    next_cursor: Optional[str] = None
+
 
 class BookDetailModel(Book):
+    # The latest reviews only; reviews_next_cursor continues the list on
+    # GET /reviews/book/{book_uid}
     reviews: List[ReviewModel]
+    reviews_next_cursor: Optional[str] = None
     tags: List[TagModel]
 
 
+class BookBatchGetModel(BaseModel):
+    uids: List[uuid.UUID] = Field(min_length=1, max_length=Config.BOOK_BATCH_GET_MAX)
+    include: List[Literal['reviews', 'tags']] = []
+    # Latest reviews embedded per book when reviews are included
+    reviews_limit: int = Field(default=Config.BOOK_DETAIL_REVIEWS_LIMIT, ge=1, le=100)
+
+
+class BookBatchItemModel(Book):
+    # None when not asked for in `include`
+    reviews: Optional[List[ReviewModel]] = None
+    tags: Optional[List[TagModel]] = None
+
+
+class BookBatchModel(BaseModel):
+    books: List[BookBatchItemModel]
+    # Requested uids with no book, in request order
+    missing: List[uuid.UUID]
+
+
+# Fits the INTEGER column and the search index's unsigned arrays
+MAX_PAGE_COUNT = 100_000
+
+
 class BookCreateModel(BaseModel):
     title: str
     author: str
     publisher: str
     publisher_date: str
-    page_count: int
+    page_count: int = Field(ge=0, le=MAX_PAGE_COUNT)
     language: str
 
 
@@ -36,5 +78,16 @@ class BookUpdateModel(BaseModel):
     title: str
     author: str
     publisher: str
-    page_count: int
-    language: str
\ No newline at end of file
+    page_count: int = Field(ge=0, le=MAX_PAGE_COUNT)
+    language: str
+
+
+class BookImportErrorModel(BaseModel):
+    row: int
+    error: str
+
+
+class BookImportReportModel(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BookImportErrorModel]
\ No newline at end of file
@@ -0,0 +1,40 @@
+import re
+from typing import Optional
+
+from sqlalchemy import REAL, func
+
+from src.db.models import BOOK_SEARCH_CONFIG, BOOK_SEARCH_VECTOR
+
+# Words as the Postgres default parser splits them, minus anything that is
+# tsquery syntax, so user input can never form operators.
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+# Terms beyond this are ignored rather than making the query ever wider
+MAX_QUERY_TERMS = 8
+
+
+def to_prefix_tsquery(text: str) -> Optional[str]:
+    """Turn free text into an AND of prefix terms, e.g. "anne:* & gree:*".
+
+    Returns None when the text contains no searchable words.
+    """
+
+    words = WORD_PATTERN.findall(text.lower())[:MAX_QUERY_TERMS]
+
+    if not words:
+        return None
+
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def search_query(tsquery: str):
+    return func.to_tsquery(BOOK_SEARCH_CONFIG, tsquery)
+
+
+def search_match(tsquery: str):
+    return BOOK_SEARCH_VECTOR.op("@@")(search_query(tsquery))
+
+
+def search_rank(tsquery: str):
+    # ts_rank returns real; typed so search cursors decode it back to float
+    return func.ts_rank(BOOK_SEARCH_VECTOR, search_query(tsquery), type_=REAL)
@@ -1,28 +1,152 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.books.schemas import BookCreateModel, BookUpdateModel
-from sqlmodel import select, desc
-from src.db.models import Book
+from src.books.schemas import BookBatchItemModel, BookCreateModel, BookDetailModel, BookUpdateModel
+from src.reviews.schemas import ReviewModel
+from sqlmodel import select
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
+from src.db.loading import load_options
+from pydantic import ValidationError
+from src.db.models import Book, BookTag, Review, Tag
+from src.books.bulk import book_to_ndjson
+from src.books.cache import book_detail_cache
+from src.books.search import search_match, search_rank, to_prefix_tsquery
+from src.books.search_index import book_search_index
+from src.pagination import DEFAULT_PAGE_SIZE, Page, paginate
+from src.config import Config
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+import uuid
 
-from datetime import datetime
+from datetime import date, datetime
+
+# Cap on the per-row errors echoed back by an import, so a completely broken
+# file cannot make the report itself unbounded.
+MAX_IMPORT_ERRORS = 1000
+
+
+def _format_import_error(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+            for err in e.errors()
+        )
+
+    return str(e)
 
 class BookService:
-    async def get_all_books(self, session: AsyncSession):
-        statement = select(Book).order_by(desc(Book.created_at))
+    async def get_all_books(self, session: AsyncSession,
+                            limit: int = DEFAULT_PAGE_SIZE, cursor: str = None,
+                            tags: Iterable[str] = (), tag_mode: str = "all") -> Page:
+        """Page through all books, optionally only those tagged with `tags`.
 
-        result = await session.exec(statement)
+        Tag names match case-insensitively; with tag_mode "all" a book needs
+        every tag, with "any" one of them is enough.
+        """
+
+        statement = select(Book).options(*load_options())
+
+        names = {name.lower() for name in tags}
+
+        if names:
+            tagged = (
+                select(BookTag.book_id)
+                .join(Tag, Tag.uid == BookTag.tag_id)
+                .where(func.lower(Tag.name).in_(names))
+            )
 
-        return result.all()
+            if tag_mode == "all":
+                tagged = tagged.group_by(BookTag.book_id).having(func.count() == len(names))
+
+            statement = statement.where(Book.uid.in_(tagged))
+
+        return await paginate(session, statement, [Book.created_at, Book.uid],
+                              limit=limit, cursor=cursor)
     
-    async def get_user_books(self, user_uid: str, session: AsyncSession):
-        statement = select(Book).where(Book.user_uid == user_uid).order_by(desc(Book.created_at))
+    async def get_user_books(self, user_uid: str, session: AsyncSession,
+                             limit: int = DEFAULT_PAGE_SIZE, cursor: str = None) -> Page:
+        statement = select(Book).where(Book.user_uid == user_uid).options(*load_options())
+
+        return await paginate(session, statement, [Book.created_at, Book.uid],
+                              limit=limit, cursor=cursor)
+
+    async def search_books(self, text: str, session: AsyncSession,
+                           language: Optional[str] = None,
+                           min_pages: Optional[int] = None, max_pages: Optional[int] = None,
+                           published_after: Optional[date] = None,
+                           published_before: Optional[date] = None,
+                           limit: int = DEFAULT_PAGE_SIZE, cursor: str = None) -> Page:
+        """Full-text search over title, author and publisher, best match first.
+
+        Every word of `text` matches as a prefix. Ranking is computed for
+        every match, so the filters are applied in the same query.
+        """
+
+        if book_search_index.enabled:
+            return await self._search_books_in_memory(
+                text, session,
+                language=language, min_pages=min_pages, max_pages=max_pages,
+                published_after=published_after, published_before=published_before,
+                limit=limit, cursor=cursor,
+            )
+
+        tsquery = to_prefix_tsquery(text)
+
+        if tsquery is None:
+            return Page(items=[], next_cursor=None)
+
+        rank = search_rank(tsquery)
+
+        statement = (
+            select(Book, rank.label("rank"))
+            .where(search_match(tsquery))
+            .options(*load_options())
+        )
+
+        if language is not None:
+            statement = statement.where(Book.language == language)
+
+        if min_pages is not None:
+            statement = statement.where(Book.page_count >= min_pages)
+
+        if max_pages is not None:
+            statement = statement.where(Book.page_count <= max_pages)
+
+        if published_after is not None:
+            statement = statement.where(Book.publisher_date >= published_after)
+
+        if published_before is not None:
+            statement = statement.where(Book.publisher_date <= published_before)
+
+        page = await paginate(session, statement, [rank, Book.uid],
+                              limit=limit, cursor=cursor,
+                              row_key=lambda row: (row.rank, row.Book.uid))
+
+        return Page(items=[row.Book for row in page.items], next_cursor=page.next_cursor)
+
+    async def _search_books_in_memory(self, text: str, session: AsyncSession, limit: int,
+                                      cursor: str = None, **filters) -> Page:
+        uids, next_cursor = book_search_index.search(text, limit=limit, cursor=cursor, **filters)
+
+        if not uids:
+            return Page(items=[], next_cursor=next_cursor)
+
+        statement = (
+            select(Book)
+            .where(Book.uid.in_(uids))
+            .options(*load_options())
+        )
 
         result = await session.exec(statement)
 
-        return result.all()
+        books = {book.uid: book for book in result}
+
+        # In ranking order; a book deleted by another process is skipped
+        return Page(items=[books[uid] for uid in uids if uid in books], next_cursor=next_cursor)
 
     
-    async def get_book(self, book_uid:str, session: AsyncSession):
-        statement = select(Book).where(Book.uid == book_uid)
+    async def get_book(self, book_uid:str, session: AsyncSession, load: Iterable = ()):
+        statement = select(Book).where(Book.uid == book_uid).options(*load_options(load))
 
         result = await session.exec(statement)
         
@@ -31,6 +155,125 @@ class BookService:
         return book if book is not None else None
 
     
+    async def get_book_detail(self, book_uid: str, session: AsyncSession,
+                              reviews_limit: int = Config.BOOK_DETAIL_REVIEWS_LIMIT):
+        """Load a book with its tags and only its latest `reviews_limit` reviews"""
+
+        statement = (
+            select(Book)
+            .where(Book.uid == book_uid)
+            .options(*load_options([Book.tags]))
+        )
+
+        result = await session.exec(statement)
+
+        book = result.first()
+
+        if book is None:
+            return None
+
+        detail = BookDetailModel.model_validate(book, from_attributes=True)
+
+        if reviews_limit > 0:
+            # Same keyset as the default order of GET /reviews/book/{book_uid},
+            # so the cursor can be handed over to it.
+            page = await paginate(
+                session,
+                select(Review).where(Review.book_uid == book.uid),
+                [Review.created_at, Review.uid],
+                limit=reviews_limit,
+            )
+
+            detail.reviews = [
+                ReviewModel.model_validate(review, from_attributes=True)
+                for review in page.items
+            ]
+            detail.reviews_next_cursor = page.next_cursor
+
+        return detail
+
+    async def get_books_by_uids(self, uids: Iterable[uuid.UUID], session: AsyncSession,
+                                include: Iterable[str] = (),
+                                reviews_limit: int = Config.BOOK_DETAIL_REVIEWS_LIMIT,
+                                ) -> Tuple[List[BookBatchItemModel], List[uuid.UUID]]:
+        """Load many books at once, in the order asked, and report the missing uids.
+
+        One IN query for the books, plus one for their tags and one for their
+        latest `reviews_limit` reviews each when included.
+        """
+
+        include = set(include)
+
+        # Request order, each uid once
+        uids = list(dict.fromkeys(uids))
+
+        statement = (
+            select(Book)
+            .where(Book.uid.in_(uids))
+            .options(*load_options([Book.tags] if 'tags' in include else []))
+        )
+
+        result = await session.exec(statement)
+
+        books = {book.uid: book for book in result}
+
+        reviews = {}
+
+        if 'reviews' in include and books:
+            reviews = await self._latest_reviews(list(books), session, reviews_limit)
+
+        items = []
+
+        for uid in uids:
+            book = books.get(uid)
+
+            if book is None:
+                continue
+
+            item = {field: getattr(book, field) for field in Book.model_fields}
+
+            if 'reviews' in include:
+                item['reviews'] = reviews.get(uid, [])
+
+            if 'tags' in include:
+                item['tags'] = book.tags
+
+            items.append(BookBatchItemModel.model_validate(item, from_attributes=True))
+
+        return items, [uid for uid in uids if uid not in books]
+
+    async def _latest_reviews(self, book_uids: list, session: AsyncSession, limit: int) -> dict:
+        """The latest `limit` reviews of each book, in one windowed query"""
+
+        position = func.row_number().over(
+            partition_by=Review.book_uid,
+            order_by=(Review.created_at.desc(), Review.uid.desc()),
+        )
+
+        ranked = (
+            select(Review, position.label("position"))
+            .where(Review.book_uid.in_(book_uids))
+            .subquery()
+        )
+
+        latest = aliased(Review, ranked)
+
+        statement = (
+            select(latest)
+            .where(ranked.c.position <= limit)
+            .order_by(ranked.c.book_uid, ranked.c.position)
+            .options(*load_options())
+        )
+
+        result = await session.exec(statement)
+
+        reviews = {}
+
+        for review in result:
+            reviews.setdefault(review.book_uid, []).append(review)
+
+        return reviews
+
     async def create_book(self, book_data: BookCreateModel,
                           user_uid: str, session: AsyncSession):
         book_data_dict = book_data.model_dump()
@@ -47,6 +290,8 @@ class BookService:
 
         await session.commit()
 
+        book_search_index.add(new_book)
+
         return new_book
 
     
@@ -60,24 +305,199 @@ class BookService:
             for k, v in update_data_dict.items():
                 setattr(book_to_update, k, v)
 
+            book_to_update.updated_at = datetime.now()
+
             await session.commit()
 
+            await book_detail_cache.invalidate(book_to_update.uid)
+
+            book_search_index.add(book_to_update)
+
             return book_to_update
         
         else:
             return None
 
 
+    async def adjust_rating_aggregates(self, book_uid, count_delta: int,
+                                       rating_delta: int, session: AsyncSession):
+        """Apply a review add/edit/delete to the book's rating aggregates.
+
+        Runs as an in-database increment inside the caller's transaction, so
+        it is atomic with the review change and safe under concurrency. The
+        caller commits.
+        """
+
+        statement = (
+            update(Book)
+            .where(Book.uid == book_uid)
+            .values(
+                review_count=Book.review_count + count_delta,
+                rating_sum=Book.rating_sum + rating_delta,
+                updated_at=datetime.now(),
+            )
+        )
+
+        await session.execute(statement)
+
     async def delete_book(self, book_uid:str, session: AsyncSession):
         book_to_delete = await self.get_book(book_uid, session)
 
         if book_to_delete is not None:
+            # Nothing is loaded to cascade through, so the rows referencing
+            # the book are handled here: reviews are kept, detached from it,
+            # and links are removed along with their tag counts.
+            await session.execute(
+                update(Review)
+                .where(Review.book_uid == book_to_delete.uid)
+                .values(book_uid=None)
+            )
+
+            result = await session.execute(
+                delete(BookTag)
+                .where(BookTag.book_id == book_to_delete.uid)
+                .returning(BookTag.tag_id)
+            )
+
+            unlinked = result.scalars().all()
+
+            if unlinked:
+                await session.execute(
+                    update(Tag)
+                    .where(Tag.uid.in_(unlinked))
+                    .values(book_count=Tag.book_count - 1)
+                )
+
             await session.delete(book_to_delete)
 
             await session.commit()
 
+            await book_detail_cache.invalidate(book_to_delete.uid)
+
+            book_search_index.remove(book_to_delete.uid)
+
             return {}
 
         else: 
             return None
 
+    async def import_books(self, rows: AsyncIterator[Tuple[int, object]],
+                           user_uid: str, session: AsyncSession,
+                           batch_size: int = 1000) -> dict:
+        """Validate rows as they stream in and insert them in batches.
+
+        Each batch is one multi-row INSERT and its own commit. A row that fails
+        validation is reported and skipped; it never aborts its batch.
+        """
+
+        report = {"inserted": 0, "failed": 0, "errors": []}
+
+        batch = []
+
+        async for row_no, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+
+                book_data = BookCreateModel.model_validate(row)
+
+                values = book_data.model_dump()
+                values['publisher_date'] = date.fromisoformat(book_data.publisher_date)
+                values['user_uid'] = user_uid
+                # Known up front so the inserted rows can be indexed for search
+                values['uid'] = uuid.uuid4()
+
+            except (ValidationError, ValueError, TypeError) as e:
+                self._record_import_error(report, row_no, e)
+                continue
+
+            batch.append((row_no, values))
+
+            if len(batch) >= batch_size:
+                await self._insert_import_batch(batch, session, report)
+                batch = []
+
+        if batch:
+            await self._insert_import_batch(batch, session, report)
+
+        return report
+
+    async def _insert_import_batch(self, batch: list, session: AsyncSession, report: dict):
+        try:
+            await session.execute(insert(Book), [values for _, values in batch])
+
+            await session.commit()
+
+        except SQLAlchemyError:
+            await session.rollback()
+
+            # Insert the rows one by one so only the ones the database rejects fail
+            return await self._insert_import_rows(batch, session, report)
+
+        report['inserted'] += len(batch)
+
+        for _, values in batch:
+            book_search_index.add(SimpleNamespace(**values))
+
+    async def _insert_import_rows(self, batch: list, session: AsyncSession, report: dict):
+        inserted = []
+
+        for row_no, values in batch:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(Book), [values])
+
+                inserted.append((row_no, values))
+
+            except SQLAlchemyError as e:
+                self._record_import_error(report, row_no, e.__class__.__name__)
+
+        try:
+            await session.commit()
+
+        except SQLAlchemyError as e:
+            await session.rollback()
+
+            for row_no, _ in inserted:
+                self._record_import_error(report, row_no, e.__class__.__name__)
+
+            return
+
+        report['inserted'] += len(inserted)
+
+        for _, values in inserted:
+            book_search_index.add(SimpleNamespace(**values))
+
+    def _record_import_error(self, report: dict, row_no: int, error) -> None:
+        report['failed'] += 1
+
+        if len(report['errors']) < MAX_IMPORT_ERRORS:
+            message = error if isinstance(error, str) else _format_import_error(error)
+
+            report['errors'].append({"row": row_no, "error": message})
+
+    async def export_books(self, session: AsyncSession, include: Iterable[str] = (),
+                           chunk_size: int = 500) -> AsyncIterator[bytes]:
+        """Stream every book as NDJSON from a server-side cursor.
+
+        Rows are fetched `chunk_size` at a time (requested relationships are
+        selectin-loaded per chunk) and each chunk is yielded as one block of
+        bytes, so memory stays flat however large the catalog is.
+        """
+
+        include = set(include)
+
+        statement = (
+            select(Book)
+            .options(*load_options(
+                relationship for name, relationship in (('reviews', Book.reviews), ('tags', Book.tags))
+                if name in include
+            ))
+            .order_by(Book.created_at, Book.uid)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        result = await session.stream_scalars(statement)
+
+        async for books in result.partitions():
+            yield b"".join(book_to_ndjson(book, include) for book in books)
@@ -1,16 +1,221 @@
 from celery import Celery
-from src.mail import mail, create_message
-from asgiref.sync import async_to_sync
+from celery.signals import worker_process_init, worker_process_shutdown
+from src.config import Config
+from src.db.main import async_session
+from src.outbox import add_to_outbox, drain_outbox
+from src.mail import (
+    EMAIL_TEMPLATES,
+    build_email,
+    compile_email_templates,
+    is_permanent_failure,
+    render_email,
+    smtp_pool,
+)
+from src.metrics import CELERY_ENQUEUE_DURATION, CELERY_ENQUEUE_FAILURES, MAIL_MESSAGES
+import asyncio
+import logging
+import os
+import threading
+import time
 
 c_app = Celery()
 
 c_app.config_from_object("src.config")
 
 
-@c_app.task()
-def send_email(recipients: list[str], subject: str, body: str):
+def enqueue(task, *args, **kwargs):
+    """`task.delay(...)`, timed and with failures counted"""
+
+    started = time.perf_counter()
+
+    try:
+        return task.delay(*args, **kwargs)
+    except Exception:
+        CELERY_ENQUEUE_FAILURES.labels(task.name).inc()
+        raise
+    finally:
+        CELERY_ENQUEUE_DURATION.labels(task.name).observe(time.perf_counter() - started)
+
+
+class WorkerLoop:
+    """One event loop per worker process, running on a daemon thread.
+
+    Tasks hand it coroutines and block on the result, so async clients such
+    as the SMTP pool keep their connections between tasks instead of getting
+    a new loop (and new connections) each time. Works with the prefork,
+    threads and solo pools; a forked child starts its own loop on first use.
+    """
+
+    def __init__(self) -> None:
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None and self._pid == os.getpid()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+
+                threading.Thread(target=self._loop.run_forever,
+                                 name="worker-event-loop", daemon=True).start()
+
+            return self._loop
+
+
+worker_loop = WorkerLoop()
+
+
+@worker_process_init.connect
+def load_email_templates(**kwargs):
+    compile_email_templates()
+
+
+@worker_process_shutdown.connect
+def close_smtp_connections(**kwargs):
+    if worker_loop.started:
+        worker_loop.run(smtp_pool.close())
+
+
+def retry_countdown(retries: int) -> float:
+    return Config.MAIL_RETRY_BACKOFF * 2 ** retries
+
+
+def email_from(message: dict):
+    """An EmailMessage from `send_email` or `send_template_email` arguments"""
+
+    if "template" in message:
+        subject, body = render_email(message["template"], message.get("context", {}))
+
+        return build_email(message["recipients"], subject, body)
+
+    return build_email(**message)
+
+
+def queue_email(session, recipients: list[str], template: str, **context):
+    """Stage a templated email in the outbox; it is sent once `session` commits.
+
+    Only the template id and `context` are stored, and the request does no
+    broker I/O: the relay_outbox task publishes the row.
+    """
+
+    if template not in EMAIL_TEMPLATES:
+        raise KeyError(f"Unknown email template: {template}")
+
+    return add_to_outbox(session, send_template_email.name, recipients, template, context)
+
+
+def deliver(task, message):
+    """Send one message, retrying `task` with backoff on transient failures"""
 
-    message = create_message(recipients=recipients, subject=subject, body=body)
+    try:
+        worker_loop.run(smtp_pool.send(message))
+    except Exception as e:
+        if is_permanent_failure(e) or task.request.retries >= task.max_retries:
+            MAIL_MESSAGES.labels("failed").inc()
+            raise
+
+        MAIL_MESSAGES.labels("retried").inc()
+        raise task.retry(exc=e, countdown=retry_countdown(task.request.retries))
+
+    MAIL_MESSAGES.labels("sent").inc()
+
+
+@c_app.task(bind=True, max_retries=Config.MAIL_SEND_ATTEMPTS - 1)
+def send_email(self, recipients: list[str], subject: str, body: str):
+
+    deliver(self, build_email(recipients=recipients, subject=subject, body=body))
+
+
+@c_app.task(bind=True, max_retries=Config.MAIL_SEND_ATTEMPTS - 1)
+def send_template_email(self, recipients: list[str], template: str, context: dict):
+
+    subject, body = render_email(template, context)
+
+    deliver(self, build_email(recipients=recipients, subject=subject, body=body))
+
+
+@c_app.task(bind=True, max_retries=Config.MAIL_SEND_ATTEMPTS - 1)
+def send_email_batch(self, messages: list[dict]):
+    """Send many emails over one connection.
+
+    Each message is a dict of `send_email`'s arguments, or of
+    `send_template_email`'s ("recipients", "template", "context").
+
+    Each message gets MAIL_SEND_ATTEMPTS tries with backoff inside the task.
+    Messages still failing transiently after that are sent again by a
+    retry of this task carrying only them; rejected ones are logged and
+    dropped.
+    """
+
+    errors = worker_loop.run(smtp_pool.send_many([email_from(m) for m in messages]))
+
+    sent = errors.count(None)
+    retry = []
+
+    for message, error in zip(messages, errors):
+        if error is None:
+            continue
+
+        if is_permanent_failure(error) or self.request.retries >= self.max_retries:
+            MAIL_MESSAGES.labels("failed").inc()
+            logging.error("Could not send email to %s: %s", message["recipients"], error)
+        else:
+            retry.append(message)
+
+    MAIL_MESSAGES.labels("sent").inc(sent)
+
+    if retry:
+        MAIL_MESSAGES.labels("retried").inc(len(retry))
+        raise self.retry(args=(retry,), countdown=retry_countdown(self.request.retries))
+
+    return {"sent": sent, "failed": len(messages) - sent}
+
+
+def publish_outbox(messages) -> dict:
+    """Hand outbox rows to the broker, templated emails grouped into batch tasks.
+
+    Returns the errors of the rows that could not be published, by row id: a
+    failed group fails its rows, and a row naming an unknown task fails
+    alone.
+    """
+
+    failed = {}
+    emails = [m for m in messages if m.task == send_template_email.name]
+    size = Config.OUTBOX_EMAILS_PER_TASK
+
+    for start in range(0, len(emails), size):
+        group = emails[start:start + size]
+
+        try:
+            enqueue(send_email_batch, [
+                {"recipients": recipients, "template": template, "context": context}
+                for recipients, template, context in (m.args for m in group)
+            ])
+        except Exception as e:
+            failed.update((m.id, e) for m in group)
+
+    for message in messages:
+        if message.task == send_template_email.name:
+            continue
+
+        try:
+            enqueue(c_app.tasks[message.task], *message.args)
+        except Exception as e:
+            failed[message.id] = e
+
+    return failed
+
+
+@c_app.task()
+def relay_outbox():
+    """Run by Celery beat every OUTBOX_RELAY_INTERVAL"""
 
-    async_to_sync(mail.send_message)(message)
-    print("Email sent")
\ No newline at end of file
+    return worker_loop.run(drain_outbox(async_session, publish_outbox))
@@ -0,0 +1,73 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response, status
+
+
+def make_etag(parts: Iterable[Any]) -> str:
+    """Strong ETag from the values that make up a representation"""
+
+    digest = hashlib.blake2b(digest_size=16)
+
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\x1f")
+
+    return f'"{digest.hexdigest()}"'
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag from the exact response body"""
+
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    # Timestamps are stored naive; they are treated as UTC consistently on
+    # the way out and on the way back in.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[str] = None) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when there is none"""
+
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+
+        # If-None-Match uses the weak comparison
+        candidates = (tag.strip() for tag in if_none_match.split(","))
+
+        return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[str] = None) -> None:
+    response.headers["ETag"] = etag
+
+    if last_modified:
+        response.headers["Last-Modified"] = last_modified
+
+
+def not_modified_response(etag: str, last_modified: Optional[str] = None) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+
+    set_validators(response, etag, last_modified)
+
+    return response
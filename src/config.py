@@ -6,6 +6,14 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
     REDIS_URL: str = "redis://localhost:6379/0"
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Set to 0 behind a transaction-mode pooler such as pgbouncer.
+    DB_STATEMENT_CACHE_SIZE: int = 100
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_FROM: str
@@ -16,7 +24,40 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = False
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    MAIL_TIMEOUT: float = 30
+    # Authenticated SMTP connections kept open per worker process
+    MAIL_POOL_SIZE: int = 4
+    MAIL_POOL_IDLE_TIMEOUT: float = 60
+    MAIL_POOL_PING_AFTER: float = 10
+    MAIL_MAX_MESSAGES_PER_CONNECTION: int = 100
+    MAIL_SEND_ATTEMPTS: int = 3
+    MAIL_RETRY_BACKOFF: float = 1.0
+    # Outbox relay: how often it runs (Celery beat) and rows published per batch
+    OUTBOX_RELAY_INTERVAL: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_BATCHES: int = 10
+    OUTBOX_EMAILS_PER_TASK: int = 25
+    OUTBOX_RETRY_BACKOFF: float = 5.0
     DOMAIN: str
+    PRINCIPAL_CACHE_TTL: int = 30
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    BOOK_IMPORT_BATCH_SIZE: int = 1000
+    BOOK_EXPORT_CHUNK_SIZE: int = 500
+    BOOK_CACHE_TTL: int = 300
+    BOOK_DETAIL_REVIEWS_LIMIT: int = 10
+    BOOK_BATCH_GET_MAX: int = 200
+    # "postgres" (full-text search) or "memory" (in-process index built at startup)
+    SEARCH_BACKEND: str = "postgres"
+    # Login, signup, password reset and send_mail (limits in src/auth/rate_limit.py)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_PREFILTER_BURST: int = 100
+    RATE_LIMIT_PREFILTER_PER_MINUTE: float = 300
+    RATE_LIMIT_PREFILTER_SIZE: int = 100000
+    SQL_INSTRUMENTATION: bool = True
+    SQL_SLOW_STATEMENT_MS: int = 100
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -27,4 +68,13 @@ Config = Settings()
 
 broker_url = Config.REDIS_URL
 
-result_backend = Config.REDIS_URL
\ No newline at end of file
+result_backend = Config.REDIS_URL
+
+beat_schedule = {
+    "relay-outbox": {
+        "task": "src.celery_tasks.relay_outbox",
+        "schedule": Config.OUTBOX_RELAY_INTERVAL,
+        # A relay stuck behind a backed up queue is superseded by the next one
+        "options": {"expires": Config.OUTBOX_RELAY_INTERVAL * 10},
+    },
+}
@@ -0,0 +1,164 @@
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.config import Config
+from src.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUTS,
+    DB_POOL_OVERFLOW,
+    DB_SLOW_STATEMENTS,
+    DB_STATEMENT_DURATION,
+)
+
+logger = logging.getLogger(__name__)
+
+# Statements are logged and kept truncated, and never with their parameters
+MAX_STATEMENT_CHARS = 500
+
+# Slow statements kept per request, and recent ones kept for /monitoring/sql
+MAX_SLOW_PER_REQUEST = 5
+RECENT_SLOW_STATEMENTS = 50
+
+
+class QueryStats:
+    """SQL statements issued while handling one request.
+
+    A single mutable object is put in the context by the middleware, so the
+    engine events (which run wherever the request's queries run, including
+    tasks spawned from it) update the same instance.
+    """
+
+    __slots__ = ("count", "duration", "slow")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.slow: List[tuple] = []
+
+    def record(self, statement: str, duration: float, slow: bool) -> None:
+        self.count += 1
+        self.duration += duration
+
+        if slow and len(self.slow) < MAX_SLOW_PER_REQUEST:
+            self.slow.append((statement, duration))
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    stats = QueryStats()
+
+    _query_stats.set(stats)
+
+    return stats
+
+
+class RouteQuerySummary:
+    """Process-local running totals per route template, for /monitoring/sql"""
+
+    def __init__(self) -> None:
+        self.routes: Dict[str, list] = {}
+        self.recent_slow: Deque[dict] = deque(maxlen=RECENT_SLOW_STATEMENTS)
+
+    def add(self, route: str, stats: QueryStats) -> None:
+        totals = self.routes.get(route)
+
+        if totals is None:
+            totals = self.routes[route] = [0, 0, 0.0, 0, 0]
+
+        totals[0] += 1
+        totals[1] += stats.count
+        totals[2] += stats.duration
+        totals[3] = max(totals[3], stats.count)
+        totals[4] += len(stats.slow)
+
+        for statement, duration in stats.slow:
+            self.recent_slow.append({
+                "route": route,
+                "statement": statement,
+                "duration_ms": round(duration * 1000, 3),
+                "at": datetime.now().isoformat(),
+            })
+
+    def snapshot(self) -> dict:
+        routes = [
+            {
+                "route": route,
+                "requests": requests,
+                "statements": statements,
+                "avg_statements": round(statements / requests, 2),
+                "max_statements": max_statements,
+                "avg_db_ms": round(duration * 1000 / requests, 3),
+                "slow_statements": slow,
+            }
+            for route, (requests, statements, duration, max_statements, slow) in self.routes.items()
+        ]
+
+        routes.sort(key=lambda r: r["statements"], reverse=True)
+
+        return {
+            "slow_statement_ms": Config.SQL_SLOW_STATEMENT_MS,
+            "routes": routes,
+            "recent_slow_statements": list(self.recent_slow),
+        }
+
+
+route_query_summary = RouteQuerySummary()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement of `engine` and add it to the current request's stats.
+
+    The per-statement cost is two clock reads, a context lookup and one
+    histogram observation.
+    """
+
+    slow_threshold = Config.SQL_SLOW_STATEMENT_MS / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._query_started
+
+        DB_STATEMENT_DURATION.observe(duration)
+
+        slow = duration >= slow_threshold
+
+        if slow:
+            statement = statement[:MAX_STATEMENT_CHARS]
+
+            DB_SLOW_STATEMENTS.inc()
+
+            logger.warning("Slow SQL statement (%.1f ms): %s", duration * 1000, statement)
+
+        stats = _query_stats.get()
+
+        if stats is not None:
+            stats.record(statement, duration, slow)
+
+
+def instrument_pool(engine: Engine) -> None:
+    """Export checkouts, checked out connections and overflow of the engine's pool"""
+
+    # engine.pool is looked up each time, dispose() replaces it
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+        DB_POOL_CHECKED_OUT.inc()
+        DB_POOL_OVERFLOW.set(max(engine.pool.overflow(), 0))
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+        DB_POOL_OVERFLOW.set(max(engine.pool.overflow(), 0))
@@ -0,0 +1,16 @@
+from typing import Iterable, List
+
+from sqlalchemy.orm import noload, selectinload
+
+
+def load_options(load: Iterable = ()) -> List:
+    """Loader options that load exactly the relationships in `load`.
+
+    Each one is selectin-loaded without any of its own relationships, and
+    every other relationship of the query is left unloaded, so a query costs
+    one statement plus one per listed relationship, whatever the models say.
+
+        select(Book).options(*load_options([Book.tags]))
+    """
+
+    return [*(selectinload(relationship).noload("*") for relationship in load), noload("*")]
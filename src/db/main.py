@@ -1,9 +1,10 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel
+from sqlalchemy import text
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.config import Config
 from src.db.models import Book
+from src.db.instrumentation import instrument_engine, instrument_pool
 
 
 # Convert sync database URL to async-compatible URL
@@ -12,9 +13,20 @@ DATABASE_URL = Config.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg:
 # Create the async engine
 engine: AsyncEngine = create_async_engine(
     url=DATABASE_URL,
-    echo=True
+    echo=Config.DB_ECHO,
+    pool_size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_MAX_OVERFLOW,
+    pool_timeout=Config.DB_POOL_TIMEOUT,
+    pool_recycle=Config.DB_POOL_RECYCLE,
+    pool_pre_ping=Config.DB_POOL_PRE_PING,
+    connect_args={"statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE}
 )
 
+instrument_pool(engine.sync_engine)
+
+if Config.SQL_INSTRUMENTATION:
+    instrument_engine(engine.sync_engine)
+
 # Create the async sessionmaker
 async_session = sessionmaker(
     bind=engine,  
@@ -22,10 +34,27 @@ async_session = sessionmaker(
     expire_on_commit=False
 )
 
-# Initialize database schema
+# Snapshot of the connection pool, to size workers against Postgres max_connections
+def get_pool_stats() -> dict:
+    pool = engine.pool
+
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool reports a negative overflow until the pool is full
+        "overflow": max(pool.overflow(), 0),
+        "open_connections": pool.checkedin() + pool.checkedout(),
+        "max_connections": pool.size() + Config.DB_MAX_OVERFLOW,
+    }
+
+# Open the first pooled connection at startup, failing fast if the database
+# is unreachable. The schema is owned by the Alembic migrations
+# (alembic upgrade head) and is never created here.
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
 
 # Dependency to provide an async session
 async def get_session() -> AsyncSession:
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Column, Relationship
+from sqlalchemy import Computed, Identity, Index, text
 import sqlalchemy.dialects.postgresql as pg
 import uuid
 from typing import List, Optional
@@ -19,6 +20,9 @@ class User:
 
 class User(SQLModel, table=True):
     __tablename__ = 'users'
+    __table_args__ = (
+        Index('ix_users_email_lower', text('lower(email)'), unique=True),
+    )
     uid: uuid.UUID = Field(
         sa_column=Column(
             pg.UUID,
@@ -40,28 +44,43 @@ class User(SQLModel, table=True):
     password_hash: str = Field(exclude=True)
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    books: List["Book"] = Relationship(back_populates='user', sa_relationship_kwargs={'lazy': 'selectin'})
-    reviews: List["Review"] = Relationship(back_populates='user', sa_relationship_kwargs={'lazy': 'selectin'})
+    # Collections are never loaded implicitly: each query picks the ones its
+    # endpoint needs with src.db.loading.load_options.
+    books: List["Book"] = Relationship(back_populates='user', sa_relationship_kwargs={'lazy': 'noload'})
+    reviews: List["Review"] = Relationship(back_populates='user', sa_relationship_kwargs={'lazy': 'noload'})
 
 
     def __repr__(self):
         return f"<User {self.username}>"
     
 class BookTag(SQLModel, table=True):
+    __table_args__ = (
+        # The primary key serves book -> tags; this serves tag -> books
+        Index("ix_booktag_tag_id_book_id", "tag_id", "book_id"),
+    )
     book_id: uuid.UUID = Field(default=None, foreign_key="books.uid", primary_key=True)
     tag_id: uuid.UUID = Field(default=None, foreign_key="tags.uid", primary_key=True)
 
 class Tag(SQLModel, table=True):
     __tablename__ = "tags"
+    __table_args__ = (
+        Index("ix_tags_name_lower", text("lower(name)"), unique=True),
+    )
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
     name: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
+    # Number of books linked to the tag, maintained with the BookTag rows
+    book_count: int = Field(default=0, sa_column=Column(
+        pg.INTEGER,
+        nullable=False,
+        server_default="0"
+    ))
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     books: List["Book"] = Relationship(
         link_model=BookTag,
         back_populates="tags",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "noload"},
     )
 
     def __repr__(self) -> str:
@@ -73,6 +92,10 @@ class Tag(SQLModel, table=True):
 
 class Book(SQLModel, table=True):
     __tablename__ = 'books' 
+    __table_args__ = (
+        Index('ix_books_created_at_uid', 'created_at', 'uid'),
+        Index('ix_books_user_uid_created_at_uid', 'user_uid', 'created_at', 'uid'),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(
@@ -89,25 +112,60 @@ class Book(SQLModel, table=True):
     page_count: int
     language: str
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
+    review_count: int = Field(default=0, sa_column=Column(
+        pg.INTEGER,
+        nullable=False,
+        server_default="0"
+    ))
+    rating_sum: int = Field(default=0, sa_column=Column(
+        pg.INTEGER,
+        nullable=False,
+        server_default="0"
+    ))
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     user: Optional[User] = Relationship(back_populates='books')
-    reviews: List["Review"] = Relationship(back_populates='book', sa_relationship_kwargs={'lazy': 'selectin'})
+    reviews: List["Review"] = Relationship(back_populates='book', sa_relationship_kwargs={'lazy': 'noload'})
     tags: List[Tag] = Relationship(
         link_model=BookTag,
         back_populates="books",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "noload"},
     )
 
 
     def __repr__(self):
         return f"<BOOK {self.title}>"
-    
+
+
+# Text search configuration of the search document; queries must use the same
+BOOK_SEARCH_CONFIG = "simple"
+
+# Full-text search document over title, author and publisher, weighted in
+# that order. Generated by Postgres and deliberately left unmapped, so loading
+# a Book never pulls the tsvector; search queries reference this column.
+BOOK_SEARCH_VECTOR = Column(
+    "search_vector",
+    pg.TSVECTOR,
+    Computed(
+        f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(author, '')), 'B') || "
+        f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(publisher, '')), 'C')",
+        persisted=True,
+    ),
+)
+Book.__table__.append_column(BOOK_SEARCH_VECTOR)
+Index("ix_books_search_vector", BOOK_SEARCH_VECTOR, postgresql_using="gin")
 
 
     
 class Review(SQLModel, table=True):
     __tablename__ = 'reviews' 
+    __table_args__ = (
+        # Keysets of GET /reviews/book/{book_uid}; both also serve plain
+        # book_uid lookups
+        Index('ix_reviews_book_uid_created_at_uid', 'book_uid', 'created_at', 'uid'),
+        Index('ix_reviews_book_uid_rating_created_at_uid', 'book_uid', 'rating', 'created_at', 'uid'),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(
@@ -133,4 +191,29 @@ class Review(SQLModel, table=True):
 
 
 
-    
\ No newline at end of file
+    
+
+
+class OutboxMessage(SQLModel, table=True):
+    """A Celery task to publish, written in the transaction that calls for it.
+
+    The API never talks to the broker: the relay (src.outbox) publishes the
+    rows and deletes them once the broker has accepted them.
+    """
+
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_available_at_id", "available_at", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, sa_column=Column(pg.BIGINT, Identity(), primary_key=True))
+    task: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
+    args: list = Field(sa_column=Column(pg.JSONB, nullable=False))
+    attempts: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))
+    last_error: Optional[str] = Field(default=None, sa_column=Column(pg.VARCHAR, nullable=True))
+    created_at: Optional[datetime] = Field(default=None, sa_column=Column(pg.TIMESTAMP, nullable=False, server_default=text("now()")))
+    # Not published before this; pushed back after a failed publish
+    available_at: Optional[datetime] = Field(default=None, sa_column=Column(pg.TIMESTAMP, nullable=False, server_default=text("now()")))
+
+    def __repr__(self):
+        return f"<OutboxMessage {self.id} {self.task}>"
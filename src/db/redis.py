@@ -1,5 +1,8 @@
 import redis.asyncio as redis  
+import uuid
 from src.config import Config
+from src.auth.cache import principal_cache
+from src.metrics import REDIS_BLOCKLIST_DURATION
 
 JTI_EXPIRY = 3600
 
@@ -15,16 +18,60 @@ token_blocklist = redis.from_url(
 )
 
 async def add_jti_to_blocklist(jti: str) -> None:
-    await token_blocklist.set(
-        name=jti,
-        value='',
-        ex=JTI_EXPIRY
-    )
+    principal_cache.invalidate(jti)
+
+    with REDIS_BLOCKLIST_DURATION.labels("add").time():
+        await token_blocklist.set(
+            name=jti,
+            value='',
+            ex=JTI_EXPIRY
+        )
 
 async def token_in_blocklist(jti: str) -> bool:
-    value = await token_blocklist.get(jti)
+    with REDIS_BLOCKLIST_DURATION.labels("check").time():
+        value = await token_blocklist.get(jti)
     return value is not None
 
+
+# Generic cache helpers sharing the same connection pool
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+async def cache_get_entry(key: str) -> dict | None:
+    """Read a cached entry stored as a Redis hash, None on a miss"""
+    entry = await token_blocklist.hgetall(key)
+
+    return {k.decode(): v for k, v in entry.items()} if entry else None
+
+async def cache_set_entry(key: str, entry: dict, ttl: int) -> None:
+    async with token_blocklist.pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        pipe.hset(key, mapping=entry)
+        pipe.expire(key, ttl)
+        await pipe.execute()
+
+async def cache_delete(*keys: str) -> None:
+    await token_blocklist.delete(*keys)
+
+async def acquire_lock(key: str, ttl_ms: int) -> str | None:
+    """Take a short-lived lock; returns the token needed to release it"""
+    token = uuid.uuid4().hex
+
+    if await token_blocklist.set(name=key, value=token, px=ttl_ms, nx=True):
+        return token
+
+    return None
+
+async def release_lock(key: str, token: str) -> None:
+    # Only delete the lock if it is still ours, it may have expired and
+    # been taken by someone else meanwhile.
+    await token_blocklist.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+
 #admin
 [
     "adding users",
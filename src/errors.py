@@ -76,6 +76,32 @@ class UserNotFound(BooklyException):
     pass
 
 
+class InvalidCursor(BooklyException):
+    """User has provided a malformed or tampered pagination cursor"""
+
+    pass
+
+
+class UnsupportedImportFormat(BooklyException):
+    """Bulk import body is neither NDJSON nor CSV"""
+
+    pass
+
+
+class PasswordHashingUnavailable(BooklyException):
+    """The password hashing pool is saturated"""
+
+    pass
+
+
+class RateLimitExceeded(BooklyException):
+    """Client has sent too many requests to a rate limited endpoint"""
+
+    def __init__(self, state) -> None:
+        super().__init__()
+        self.headers = state.headers()
+
+
 class AccountNotVerified(Exception):
     """Account not yet verified"""
     pass
@@ -230,6 +256,53 @@ def register_all_errors(app: FastAPI):
         ),
     )
 
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid pagination cursor",
+                "resolution": "Please use the next_cursor returned by the previous page",
+                "error_code": "invalid_cursor",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        UnsupportedImportFormat,
+        create_exception_handler(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            initial_detail={
+                "message": "Unsupported import format",
+                "resolution": "Send application/x-ndjson or text/csv",
+                "error_code": "unsupported_import_format",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        PasswordHashingUnavailable,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "Server is busy, please try again shortly",
+                "error_code": "server_busy",
+            },
+        ),
+    )
+
+    @app.exception_handler(RateLimitExceeded)
+    async def rate_limit_exceeded(request, exc: RateLimitExceeded):
+
+        return JSONResponse(
+            content={
+                "message": "Too many requests, please try again later",
+                "error_code": "rate_limited",
+            },
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers=exc.headers,
+        )
+
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
 
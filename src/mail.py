@@ -1,5 +1,16 @@
+import asyncio
+import logging
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 from fastapi_mail import FastMail, ConnectionConfig, MessageSchema, MessageType
 from src.config import Config
+from src.metrics import MAIL_CONNECTIONS_OPENED
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -8,13 +19,13 @@ mail_config = ConnectionConfig(
     MAIL_USERNAME=Config.MAIL_USERNAME,
     MAIL_PASSWORD=Config.MAIL_PASSWORD,
     MAIL_FROM=Config.MAIL_FROM,
-    MAIL_PORT=587,
+    MAIL_PORT=Config.MAIL_PORT,
     MAIL_SERVER=Config.MAIL_SERVER,
     MAIL_FROM_NAME=Config.MAIL_FROM_NAME,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
+    MAIL_STARTTLS=Config.MAIL_STARTTLS,
+    MAIL_SSL_TLS=Config.MAIL_SSL_TLS,
+    USE_CREDENTIALS=Config.USE_CREDENTIALS,
+    VALIDATE_CERTS=Config.VALIDATE_CERTS,
     TEMPLATE_FOLDER=Path(BASE_DIR, "templates"),
 )
 
@@ -31,4 +42,261 @@ def create_message(recipients:list[str], subject:str, body:str):
         subtype=MessageType.html
     )
 
-    return message
\ No newline at end of file
+    return message
+
+
+# Template id -> (file in TEMPLATE_FOLDER, subject). Handlers enqueue an id and
+# its context; the worker renders.
+EMAIL_TEMPLATES = {
+    "welcome": ("welcome.html", "📚 Welcome to Bookly!"),
+    "verify_email": ("verify_email.html", "📚 Verify Your Email!"),
+    "password_reset": ("password_reset.html", "📚 Reset Your Password"),
+}
+
+template_env = Environment(
+    loader=FileSystemLoader(mail_config.TEMPLATE_FOLDER),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+)
+
+
+@lru_cache(maxsize=None)
+def get_email_template(template_id: str) -> Template:
+    """The compiled template, loaded from disk once per process"""
+
+    file_name, _ = EMAIL_TEMPLATES[template_id]
+
+    return template_env.get_template(file_name)
+
+
+def compile_email_templates() -> None:
+    for template_id in EMAIL_TEMPLATES:
+        get_email_template(template_id)
+
+
+def render_email(template_id: str, context: dict) -> Tuple[str, str]:
+    """Subject and HTML body of a registered template"""
+
+    _, subject = EMAIL_TEMPLATES[template_id]
+
+    return subject, get_email_template(template_id).render(**context)
+
+
+def build_email(recipients: List[str], subject: str, body: str) -> EmailMessage:
+    """The HTML message `create_message` describes, ready for an SMTP connection"""
+
+    message = EmailMessage()
+    message["From"] = formataddr((Config.MAIL_FROM_NAME, Config.MAIL_FROM))
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body, subtype="html")
+
+    return message
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """5xx replies (bad recipient, rejected content...) won't succeed on retry"""
+
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(refused.code >= 500 for refused in error.recipients)
+
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return error.code >= 500
+
+    return False
+
+
+class SMTPConnection:
+    __slots__ = ("smtp", "sent", "last_used")
+
+    def __init__(self, smtp: aiosmtplib.SMTP) -> None:
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    async def send(self, message: EmailMessage) -> None:
+        await self.smtp.send_message(message)
+
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    async def close(self) -> None:
+        try:
+            if self.smtp.is_connected:
+                await self.smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class SMTPPool:
+    """Authenticated SMTP connections kept open and reused between messages.
+
+    Opening a connection costs a TCP connect, a STARTTLS handshake and a
+    login; a pooled one costs nothing until it is recycled. Connections are
+    closed after `max_messages` (providers cap messages per session) or once
+    idle for `idle_timeout`, and pinged with NOOP before reuse when idle for
+    more than `ping_after`, the way DB_POOL_PRE_PING does for the database.
+    At most `size` connections are open; callers beyond that wait.
+
+    Connections belong to the event loop they were opened on; the Celery
+    worker runs every send on one persistent loop per process (see
+    src.celery_tasks.WorkerLoop).
+    """
+
+    def __init__(self, size: int = Config.MAIL_POOL_SIZE,
+                 idle_timeout: float = Config.MAIL_POOL_IDLE_TIMEOUT,
+                 ping_after: float = Config.MAIL_POOL_PING_AFTER,
+                 max_messages: int = Config.MAIL_MAX_MESSAGES_PER_CONNECTION,
+                 **smtp_options) -> None:
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.max_messages = max_messages
+        self.smtp_options = {
+            "hostname": Config.MAIL_SERVER,
+            "port": Config.MAIL_PORT,
+            "username": Config.MAIL_USERNAME if Config.USE_CREDENTIALS else None,
+            "password": Config.MAIL_PASSWORD if Config.USE_CREDENTIALS else None,
+            "start_tls": Config.MAIL_STARTTLS,
+            "use_tls": Config.MAIL_SSL_TLS,
+            "validate_certs": Config.VALIDATE_CERTS,
+            "timeout": Config.MAIL_TIMEOUT,
+            **smtp_options,
+        }
+        self._idle: List[SMTPConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def acquire(self) -> SMTPConnection:
+        loop = asyncio.get_running_loop()
+
+        # First use, or a new loop (e.g. in a forked worker): the connections
+        # and the semaphore of the previous one can't be used from here.
+        if loop is not self._loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.size)
+            self._idle = []
+
+        await self._slots.acquire()
+
+        try:
+            while self._idle:
+                connection = self._idle.pop()
+
+                if await self._usable(connection):
+                    return connection
+
+                await connection.close()
+
+            return await self._connect()
+
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, connection: SMTPConnection, broken: bool = False) -> None:
+        """Give a connection back; a `broken` one (failed mid-conversation) is closed"""
+
+        try:
+            if broken or connection.sent >= self.max_messages or not connection.smtp.is_connected:
+                await connection.close()
+            else:
+                self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    async def send(self, message: EmailMessage) -> None:
+        """Send one message over a pooled connection"""
+
+        error, = await self.send_many([message], attempts=1)
+
+        if error is not None:
+            raise error
+
+    async def send_many(self, messages: List[EmailMessage],
+                        attempts: int = Config.MAIL_SEND_ATTEMPTS,
+                        backoff: float = Config.MAIL_RETRY_BACKOFF) -> List[Optional[Exception]]:
+        """Send `messages` in order over one connection, and return each one's error or None.
+
+        A message failing with a transient error (dropped connection, timeout,
+        4xx reply) is retried on a fresh connection after `backoff`, doubled on
+        each further attempt, up to `attempts` tries. A 5xx reply fails only
+        that message and the session carries on with the next one.
+        """
+
+        errors: List[Optional[Exception]] = []
+        connection = None
+
+        try:
+            for message in messages:
+                error = None
+
+                for attempt in range(attempts):
+                    if attempt:
+                        await asyncio.sleep(backoff * 2 ** (attempt - 1))
+
+                    try:
+                        if connection is None:
+                            connection = await self.acquire()
+
+                        await connection.send(message)
+                        error = None
+                        break
+
+                    except (aiosmtplib.SMTPException, OSError) as e:
+                        error = e
+
+                        if is_permanent_failure(e):
+                            break
+
+                        if connection is not None:
+                            await self.release(connection, broken=True)
+                            connection = None
+
+                errors.append(error)
+
+                if connection is not None and connection.sent >= self.max_messages:
+                    await self.release(connection)
+                    connection = None
+
+        finally:
+            if connection is not None:
+                await self.release(connection)
+
+        return errors
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+
+        for connection in idle:
+            await connection.close()
+
+    async def _usable(self, connection: SMTPConnection) -> bool:
+        idle_for = time.monotonic() - connection.last_used
+
+        if not connection.smtp.is_connected or idle_for > self.idle_timeout:
+            return False
+
+        if idle_for > self.ping_after:
+            try:
+                await connection.smtp.noop()
+            except (aiosmtplib.SMTPException, OSError):
+                return False
+
+        return True
+
+    async def _connect(self) -> SMTPConnection:
+        smtp = aiosmtplib.SMTP(**self.smtp_options)
+
+        # Connects, upgrades with STARTTLS and logs in as configured
+        await smtp.connect()
+
+        MAIL_CONNECTIONS_OPENED.inc()
+
+        logging.debug("Opened SMTP connection to %s:%s",
+                      self.smtp_options["hostname"], self.smtp_options["port"])
+
+        return SMTPConnection(smtp)
+
+
+smtp_pool = SMTPPool()
@@ -0,0 +1,145 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# With several uvicorn/gunicorn workers, point PROMETHEUS_MULTIPROC_DIR at an
+# empty directory (wiped before each start) shared by the workers: every
+# process then writes its samples there and /metrics aggregates them all.
+# Gauges use "livesum" so that values from every live worker are added
+# together.
+
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "bookly_password_hash_queue_depth",
+    "Password hash/verify jobs submitted to the worker pool and not finished yet",
+    multiprocess_mode="livesum",
+)
+
+PASSWORD_HASH_REJECTED = Counter(
+    "bookly_password_hash_rejected",
+    "Password hash/verify jobs rejected because the worker pool queue was full",
+)
+
+DB_STATEMENT_DURATION = Histogram(
+    "bookly_db_statement_duration_seconds",
+    "Execution time of SQL statements",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+DB_SLOW_STATEMENTS = Counter(
+    "bookly_db_slow_statements",
+    "SQL statements slower than SQL_SLOW_STATEMENT_MS",
+)
+
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "bookly_db_statements_per_request",
+    "SQL statements issued per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+
+DB_TIME_PER_REQUEST = Histogram(
+    "bookly_db_time_per_request_seconds",
+    "Total SQL execution time per HTTP request",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "bookly_http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "bookly_http_requests_in_progress",
+    "HTTP requests being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKOUTS = Counter(
+    "bookly_db_pool_checkouts",
+    "Connections checked out of the database pool",
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "bookly_db_pool_checked_out",
+    "Database connections currently checked out",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "bookly_db_pool_overflow",
+    "Database connections open beyond DB_POOL_SIZE",
+    multiprocess_mode="livesum",
+)
+
+REDIS_BLOCKLIST_DURATION = Histogram(
+    "bookly_redis_blocklist_duration_seconds",
+    "Latency of token blocklist calls to Redis",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+
+CELERY_ENQUEUE_DURATION = Histogram(
+    "bookly_celery_enqueue_duration_seconds",
+    "Time taken to hand a task to the Celery broker",
+    ["task"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+CELERY_ENQUEUE_FAILURES = Counter(
+    "bookly_celery_enqueue_failures",
+    "Tasks that could not be handed to the Celery broker",
+    ["task"],
+)
+
+MAIL_MESSAGES = Counter(
+    "bookly_mail_messages",
+    "Emails handled by the worker, by outcome (sent, retried, failed)",
+    ["outcome"],
+)
+
+MAIL_CONNECTIONS_OPENED = Counter(
+    "bookly_mail_connections_opened",
+    "Authenticated SMTP connections opened by the worker",
+)
+
+RATE_LIMITED = Counter(
+    "bookly_rate_limited_requests",
+    "Requests rejected by rate limiting, by endpoint and by where (prefilter or redis)",
+    ["endpoint", "source"],
+)
+
+
+def multiprocess_enabled() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def render_metrics() -> tuple:
+    """Exposition of every metric, aggregated over all workers in multiprocess mode"""
+
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges on shutdown in multiprocess mode"""
+
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
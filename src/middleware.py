@@ -4,19 +4,66 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import time
 import logging
+from src.db.instrumentation import route_query_summary, start_query_stats
+from src.metrics import (
+    DB_STATEMENTS_PER_REQUEST,
+    DB_TIME_PER_REQUEST,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_PROGRESS,
+)
 
 logger = logging.getLogger("uvicorn.access")
 logger.disabled = True
 
 
+def route_template(request: Request) -> str:
+    """The matched route's path template, so label values stay bounded"""
+
+    route = request.scope.get("route")
+
+    return f"{request.method} {route.path}" if route is not None else "unmatched"
+
+
 def register_middleware(app: FastAPI):
 
     @app.middleware("http")
     async def custom_logging(request: Request, call_next):
         start_time = time.time()
 
-        response = await call_next(request)
-        processing_time = time.time() - start_time
+        query_stats = start_query_stats()
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(request.method)
+        in_progress.inc()
+
+        status_code = 500
+
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            in_progress.dec()
+
+            processing_time = time.time() - start_time
+
+            route = route_template(request)
+
+            HTTP_REQUEST_DURATION.labels(request.method, route, status_code).observe(processing_time)
+
+        # Streaming bodies are sent after this point; their queries are not
+        # in the header.
+        response.headers["Server-Timing"] = (
+            f'db;dur={query_stats.duration * 1000:.2f};desc="{query_stats.count} queries", '
+            f'app;dur={processing_time * 1000:.2f}'
+        )
+
+        rate_limit = getattr(request.state, "rate_limit", None)
+
+        if rate_limit is not None:
+            response.headers.update(rate_limit.headers())
+
+        DB_STATEMENTS_PER_REQUEST.labels(route).observe(query_stats.count)
+        DB_TIME_PER_REQUEST.labels(route).observe(query_stats.duration)
+        route_query_summary.add(route, query_stats)
 
         message = f"{request.client.host}:{request.client.port} - {request.method} - {request.url.path} - {response.status_code} completed after {processing_time}s"
 
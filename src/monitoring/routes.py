@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Response
+
+from src.auth.dependencies import RoleChecker
+from src.db.instrumentation import route_query_summary
+from src.db.main import get_pool_stats
+from src.metrics import render_metrics
+
+monitoring_router = APIRouter()
+# Served at the root for Prometheus scrapers, which carry no bearer token;
+# keep it reachable from the internal network only.
+metrics_router = APIRouter()
+admin_role_checker = Depends(RoleChecker(["admin"]))
+
+
+@monitoring_router.get("/db-pool", dependencies=[admin_role_checker])
+async def db_pool_stats():
+    return get_pool_stats()
+
+
+@monitoring_router.get("/sql", dependencies=[admin_role_checker])
+async def sql_stats():
+    """Statements and DB time per route in this worker, and recent slow statements"""
+
+    return route_query_summary.snapshot()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+
+    return Response(content=body, media_type=content_type)
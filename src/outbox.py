@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import delete, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import Config
+from src.db.models import OutboxMessage
+
+MAX_ERROR_CHARS = 500
+
+# Failed publishes back off OUTBOX_RETRY_BACKOFF * 2**attempts, up to this exponent
+MAX_BACKOFF_EXPONENT = 6
+
+
+def add_to_outbox(session: AsyncSession, task_name: str, *args) -> OutboxMessage:
+    """Stage a task in the session; it exists only if the transaction commits"""
+
+    message = OutboxMessage(task=task_name, args=list(args))
+
+    session.add(message)
+
+    return message
+
+
+# Takes a batch of rows and returns the errors of those it could not
+# publish, by row id; the rest are deleted.
+Publisher = Callable[[List[OutboxMessage]], Dict[int, Exception]]
+
+
+async def relay_batch(session: AsyncSession, publish: Publisher,
+                      batch_size: int = Config.OUTBOX_BATCH_SIZE) -> int:
+    """Publish the oldest due messages and delete them, in one transaction.
+
+    Rows are locked with SKIP LOCKED, so concurrent relays take different
+    batches. Rows `publish` reports as failed are kept and pushed back with
+    exponential backoff, each on its own, so one bad row does not hold back
+    the others. If `publish` raises, the whole batch is pushed back and the
+    error re-raised. Delivery is at least once: a relay dying between
+    publishing and committing publishes the batch again.
+
+    Returns the number of messages published.
+    """
+
+    statement = (
+        select(OutboxMessage)
+        .where(OutboxMessage.available_at <= func.now())
+        .order_by(OutboxMessage.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+    messages = (await session.exec(statement)).all()
+
+    if not messages:
+        await session.commit()
+        return 0
+
+    try:
+        # publish does blocking broker I/O
+        failed = await asyncio.to_thread(publish, messages)
+
+    except Exception as e:
+        await _back_off(session, {message.id: e for message in messages})
+        await session.commit()
+
+        logging.warning("Could not publish %d outbox messages: %s", len(messages), e)
+
+        raise
+
+    published = [message.id for message in messages if message.id not in failed]
+
+    if failed:
+        await _back_off(session, failed)
+
+        logging.warning("Could not publish %d of %d outbox messages: %s",
+                        len(failed), len(messages), next(iter(failed.values())))
+
+    if published:
+        await session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(published)))
+
+    await session.commit()
+
+    return len(published)
+
+
+async def _back_off(session: AsyncSession, errors: Dict[int, Exception]) -> None:
+    backoff = timedelta(seconds=Config.OUTBOX_RETRY_BACKOFF)
+
+    # One statement per distinct error, which is usually one for the batch
+    by_error: Dict[str, List[int]] = {}
+
+    for message_id, error in errors.items():
+        by_error.setdefault(str(error)[:MAX_ERROR_CHARS], []).append(message_id)
+
+    for error, ids in by_error.items():
+        await session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(ids))
+            .values(
+                attempts=OutboxMessage.attempts + 1,
+                last_error=error,
+                available_at=func.now() + backoff * func.power(
+                    2, func.least(OutboxMessage.attempts, MAX_BACKOFF_EXPONENT)
+                ),
+            )
+        )
+
+
+async def drain_outbox(session_maker, publish: Publisher,
+                       batch_size: int = Config.OUTBOX_BATCH_SIZE,
+                       max_batches: int = Config.OUTBOX_MAX_BATCHES) -> int:
+    """Relay batches until the outbox has no due messages left, or `max_batches`.
+
+    A batch with failures also stops the drain until the next run, so a
+    broker outage costs one batch per run rather than `max_batches`.
+    """
+
+    relayed = 0
+
+    for _ in range(max_batches):
+        async with session_maker() as session:
+            count = await relay_batch(session, publish, batch_size)
+
+        relayed += count
+
+        if count < batch_size:
+            break
+
+    return relayed
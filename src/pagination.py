@@ -0,0 +1,144 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import desc, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.errors import InvalidCursor
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+
+    if isinstance(value, uuid.UUID):
+        return str(value)
+
+    return value
+
+
+def _load_value(column, value: Any) -> Any:
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+
+    if value is None:
+        return None
+
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+
+    if python_type is date:
+        return date.fromisoformat(value)
+
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+
+    return python_type(value)
+
+
+def cursor_order(columns: Sequence[Any], descending: bool = True) -> str:
+    """Name of a keyset order, e.g. "created_at,uid:desc", stored in its cursors"""
+
+    names = [getattr(c, "key", None) or getattr(c, "name", None) or "?" for c in columns]
+
+    return ",".join(names) + (":desc" if descending else ":asc")
+
+
+def encode_cursor(values: Sequence[Any], order: str = "") -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor.
+
+    `order` names the sort the cursor belongs to (see cursor_order), so it
+    can't be replayed against another one.
+    """
+
+    payload = json.dumps({"order": order, "values": [_dump_value(v) for v in values]},
+                         separators=(",", ":"))
+
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any], order: str = "") -> list:
+    """Decode a cursor back into values typed after the keyset columns"""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+        if not isinstance(payload, dict) or payload.get("order") != order:
+            raise InvalidCursor()
+
+        values = payload.get("values")
+
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor()
+
+        return [_load_value(c, v) for c, v in zip(columns, values)]
+
+    except (binascii.Error, UnicodeDecodeError, AttributeError, TypeError, ValueError):
+        # Tampered slots of the wrong JSON type fail inside the parsers
+        raise InvalidCursor()
+
+
+async def paginate(
+    session: AsyncSession,
+    statement,
+    columns: Sequence[Any],
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+    row_key: Optional[Callable[[Any], Sequence[Any]]] = None,
+) -> Page:
+    """Run a keyset (seek) paginated query.
+
+    `columns` is the sort key and must be unique as a whole, so the last one
+    is normally the primary key used as a tiebreak. One extra row is fetched
+    to find out whether there is a next page.
+    """
+
+    order = cursor_order(columns, descending)
+
+    if cursor:
+        values = decode_cursor(cursor, columns, order)
+
+        key = tuple_(*columns)
+
+        if descending:
+            statement = statement.where(key < tuple_(*values))
+        else:
+            statement = statement.where(key > tuple_(*values))
+
+    order_by = [desc(c) if descending else c for c in columns]
+
+    statement = statement.order_by(*order_by).limit(limit + 1)
+
+    result = await session.exec(statement)
+
+    rows = result.all()
+
+    next_cursor = None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+
+        last = rows[-1]
+
+        if row_key is not None:
+            next_cursor = encode_cursor(row_key(last), order)
+        else:
+            next_cursor = encode_cursor([getattr(last, c.key) for c in columns], order)
+
+    return Page(items=rows, next_cursor=next_cursor)
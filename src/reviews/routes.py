@@ -1,19 +1,43 @@
-from fastapi import APIRouter, Depends
-from src.db.models import User
-from .schemas import ReviewCreateModel
+from fastapi import APIRouter, Depends, Query
+from typing import Literal, Optional
+from src.auth.schemas import UserPrincipalModel
+from .schemas import ReviewCreateModel, ReviewPageModel
 from src.db.main import get_session
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .service import ReviewService
-from src.auth.dependencies import get_current_user
+from src.auth.dependencies import RoleChecker, get_current_user
+from src.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 review_router = APIRouter()
 review_service =  ReviewService()
+role_checker = Depends(RoleChecker(['admin', 'user']))
+
+
+@review_router.get('/book/{book_uid}', response_model=ReviewPageModel, dependencies=[role_checker])
+async def get_book_reviews(
+    book_uid: str,
+    session: AsyncSession = Depends(get_session),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal['created_at', 'rating'] = 'created_at',
+    order: Literal['desc', 'asc'] = 'desc'
+):
+    page = await review_service.get_book_reviews(
+        book_uid=book_uid,
+        session=session,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        descending=order == 'desc'
+    )
+
+    return {"reviews": page.items, "next_cursor": page.next_cursor}
 
 @review_router.post('/book/{book_uid}')
 async def add_review_to_book(
     book_uid: str,
     review_data: ReviewCreateModel,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipalModel = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     new_review = await review_service.add_review_to_book(
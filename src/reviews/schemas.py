@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 import uuid
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class ReviewModel(BaseModel):
@@ -14,6 +14,11 @@ class ReviewModel(BaseModel):
 
 
 
+class ReviewPageModel(BaseModel):
+    reviews: List[ReviewModel]
+    next_cursor: Optional[str] = None
+
+
 class ReviewCreateModel(BaseModel):
     rating: int = Field(lt=5)
     review_text: str
\ No newline at end of file
@@ -1,6 +1,10 @@
 from src.db.models import Review
 from src.auth.service import UserService
 from src.books.service import BookService
+from src.books.cache import book_detail_cache
+from src.db.loading import load_options
+from src.pagination import DEFAULT_PAGE_SIZE, Page, paginate
+from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.reviews.schemas import ReviewCreateModel
 from fastapi.exceptions import HTTPException
@@ -11,9 +15,29 @@ import logging
 book_service = BookService()
 user_service = UserService()
 
+# Keyset columns per sort order; uid last so the order is total
+REVIEW_SORT_COLUMNS = {
+    "created_at": [Review.created_at, Review.uid],
+    "rating": [Review.rating, Review.created_at, Review.uid],
+}
+
 
 class ReviewService:
 
+    async def get_book_reviews(self, book_uid: str, session: AsyncSession,
+                               limit: int = DEFAULT_PAGE_SIZE, cursor: str = None,
+                               sort: str = "created_at", descending: bool = True) -> Page:
+        statement = select(Review).where(Review.book_uid == book_uid).options(*load_options())
+
+        return await paginate(
+            session,
+            statement,
+            REVIEW_SORT_COLUMNS[sort],
+            limit=limit,
+            cursor=cursor,
+            descending=descending,
+        )
+
     async def add_review_to_book(self,user_email: str, book_uid: str, review_data: ReviewCreateModel, session: AsyncSession):
         try:
             book = await book_service.get_book(
@@ -50,8 +74,15 @@ class ReviewService:
 
             session.add(new_review)
 
+            # Also bumps the book's updated_at, its detail changes with its reviews
+            await book_service.adjust_rating_aggregates(
+                book.uid, 1, new_review.rating, session
+            )
+
             await session.commit()
 
+            await book_detail_cache.invalidate(book.uid)
+
             return new_review
 
         except Exception as e:
@@ -1,14 +1,15 @@
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 from src.auth.dependencies import RoleChecker
 from src.books.schemas import Book
+from src.conditional import is_not_modified, make_etag, not_modified_response, set_validators
 from src.db.main import get_session
 
-from .schemas import TagAddModel, TagCreateModel, TagModel
+from .schemas import TagAddModel, TagCountModel, TagCreateModel, TagModel
 from .service import TagService
 
 tags_router = APIRouter()
@@ -16,9 +17,21 @@ tag_service = TagService()
 user_role_checker = Depends(RoleChecker(["user", "admin"]))
 
 
-@tags_router.get("/", response_model=List[TagModel], dependencies=[user_role_checker])
-async def get_all_tags(session: AsyncSession = Depends(get_session)):
-    tags = await tag_service.get_tags(session)
+@tags_router.get("/", response_model=List[TagCountModel], dependencies=[user_role_checker])
+async def get_all_tags(
+    request: Request,
+    response: Response,
+    sort: Literal["created_at", "book_count"] = "created_at",
+    session: AsyncSession = Depends(get_session),
+):
+    tags = await tag_service.get_tags(session, sort=sort)
+
+    etag = make_etag((tag.uid, tag.name, tag.created_at, tag.book_count) for tag in tags)
+
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    set_validators(response, etag)
 
     return tags
 
@@ -11,6 +11,10 @@ class TagModel(BaseModel):
     created_at: datetime
 
 
+class TagCountModel(TagModel):
+    book_count: int
+
+
 class TagCreateModel(BaseModel):
     name: str
 
@@ -1,16 +1,19 @@
+from datetime import datetime
+
 from fastapi import status
 from fastapi.exceptions import HTTPException
-from sqlmodel import desc, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import delete, update
+from sqlmodel import desc, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.books.service import BookService
-from src.db.models import Tag
+from src.books.cache import book_detail_cache
+from src.db.loading import load_options
+from src.db.models import Book, BookTag, Tag
 
 from .schemas import TagAddModel, TagCreateModel
 from src.errors import BookNotFound, TagNotFound, TagAlreadyExists
 
-book_service = BookService()
-
 
 server_error = HTTPException(
     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Something went wrong"
@@ -19,10 +22,15 @@ server_error = HTTPException(
 
 class TagService:
 
-    async def get_tags(self, session: AsyncSession):
-        """Get all tags"""
+    async def get_tags(self, session: AsyncSession, sort: str = "created_at"):
+        """Get all tags, newest first or, for facets, most used first"""
 
-        statement = select(Tag).order_by(desc(Tag.created_at))
+        statement = select(Tag).options(*load_options())
+
+        if sort == "book_count":
+            statement = statement.order_by(desc(Tag.book_count), Tag.name)
+        else:
+            statement = statement.order_by(desc(Tag.created_at))
 
         result = await session.exec(statement)
 
@@ -31,30 +39,84 @@ class TagService:
     async def add_tags_to_book(
         self, book_uid: str, tag_data: TagAddModel, session: AsyncSession
     ):
-        """Add tags to a book"""
+        """Add tags to a book
+
+        All tag names are resolved with one IN query, missing tags are
+        inserted in one statement and links that already exist are skipped
+        by the database, so the cost no longer grows with the tag count.
+        """
 
-        book = await book_service.get_book(book_uid=book_uid, session=session)
+        statement = (
+            select(Book)
+            .where(Book.uid == book_uid)
+            .options(*load_options())
+        )
+
+        result = await session.exec(statement)
+
+        book = result.first()
 
         if not book:
             raise BookNotFound()
 
+        # Tag names are unique case-insensitively, keep the first spelling.
+        names = {}
         for tag_item in tag_data.tags:
-            result = await session.exec(select(Tag).where(Tag.name == tag_item.name))
+            names.setdefault(tag_item.name.lower(), tag_item.name)
+
+        if names:
+            tag_uids = await self._resolve_tag_uids(list(names), session)
 
-            tag = result.one_or_none()
-            if not tag:
-                tag = Tag(name=tag_item.name)
+            missing = [key for key in names if key not in tag_uids]
+
+            if missing:
+                await session.execute(
+                    insert(Tag)
+                    .values([{"name": names[key]} for key in missing])
+                    .on_conflict_do_nothing()
+                )
+
+                tag_uids.update(await self._resolve_tag_uids(missing, session))
+
+            result = await session.execute(
+                insert(BookTag)
+                .values([{"book_id": book.uid, "tag_id": uid} for uid in tag_uids.values()])
+                .on_conflict_do_nothing()
+                .returning(BookTag.tag_id)
+            )
+
+            linked = result.scalars().all()
+
+            if linked:
+                book.updated_at = datetime.now()
+
+                # Only links that were actually created count, so repeated
+                # adds never double count.
+                await session.execute(
+                    update(Tag)
+                    .where(Tag.uid.in_(linked))
+                    .values(book_count=Tag.book_count + 1)
+                )
 
-            book.tags.append(tag)
-        session.add(book)
         await session.commit()
-        await session.refresh(book)
+
+        await book_detail_cache.invalidate(book.uid)
+
         return book
 
+    async def _resolve_tag_uids(self, names: list, session: AsyncSession) -> dict:
+        """Map lower-cased tag names to tag uids"""
+
+        name_key = func.lower(Tag.name)
+
+        result = await session.exec(select(Tag.uid, name_key).where(name_key.in_(names)))
+
+        return {name: uid for uid, name in result.all()}
+
     async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession):
         """Get tag by uid"""
 
-        statement = select(Tag).where(Tag.uid == tag_uid)
+        statement = select(Tag).where(Tag.uid == tag_uid).options(*load_options())
 
         result = await session.exec(statement)
 
@@ -63,7 +125,7 @@ class TagService:
     async def add_tag(self, tag_data: TagCreateModel, session: AsyncSession):
         """Create a tag"""
 
-        statement = select(Tag).where(Tag.name == tag_data.name)
+        statement = select(Tag).where(func.lower(Tag.name) == tag_data.name.lower())
 
         result = await session.exec(statement)
 
@@ -94,20 +156,50 @@ class TagService:
         for k, v in update_data_dict.items():
             setattr(tag, k, v)
 
-            await session.commit()
+        # Book details show tag names, so the tagged books change with it
+        result = await session.exec(select(BookTag.book_id).where(BookTag.tag_id == tag.uid))
+
+        tagged = result.all()
+
+        await self._touch_books(tagged, session)
+
+        await session.commit()
+
+        await session.refresh(tag)
 
-            await session.refresh(tag)
+        for book_uid in tagged:
+            await book_detail_cache.invalidate(book_uid)
 
         return tag
 
     async def delete_tag(self, tag_uid: str, session: AsyncSession):
         """Delete a tag"""
 
-        tag = self.get_tag_by_uid(tag_uid,session)
+        tag = await self.get_tag_by_uid(tag_uid,session)
 
         if not tag:
             raise TagNotFound()
 
+        # Tag.books is not loaded to cascade through, unlink explicitly
+        result = await session.execute(
+            delete(BookTag).where(BookTag.tag_id == tag.uid).returning(BookTag.book_id)
+        )
+
+        unlinked = result.scalars().all()
+
+        await self._touch_books(unlinked, session)
+
         await session.delete(tag)
 
-        await session.commit()
\ No newline at end of file
+        await session.commit()
+
+        for book_uid in unlinked:
+            await book_detail_cache.invalidate(book_uid)
+
+    async def _touch_books(self, book_uids: list, session: AsyncSession) -> None:
+        """Bump updated_at, and so the validators, of books whose detail changed"""
+
+        if book_uids:
+            await session.execute(
+                update(Book).where(Book.uid.in_(book_uids)).values(updated_at=datetime.now())
+            )
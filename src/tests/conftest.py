@@ -2,6 +2,7 @@ from src.db.main import get_session
 from src.auth.dependencies import AccessTokenBearer, RoleChecker, RefreshTokenBearer
 from src import app
 from fastapi.testclient import TestClient
+from src.auth.rate_limit import auth_rate_limiter
 from unittest.mock import Mock
 import pytest
 
@@ -24,6 +25,9 @@ app.dependency_overrides[get_session] = get_mock_session
 app.dependency_overrides[role_checker] = Mock()
 app.dependency_overrides[refresh_token_bearer] = Mock()
 
+# Limits are shared through Redis and would carry over between test runs
+auth_rate_limiter.enabled = False
+
 @pytest.fixture
 def fake_session(): 
     return mock_session
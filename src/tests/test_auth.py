@@ -1,4 +1,19 @@
-from src.auth.schemas import UserCreateModel
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from src import app
+from src.auth import dependencies, routes as auth_routes
+from src.auth.dependencies import AccessTokenBearer
+from src.auth.cache import PrincipalCache
+from src.auth.schemas import UserCreateModel, UserPrincipalModel
+from src.auth.utils import PasswordHashPool
+from src.errors import PasswordHashingUnavailable
 
 
 auth_prefix = f"/api/v1/auth"
@@ -21,4 +36,86 @@ def test_user_creation(fake_session, fake_user_service, test_client):
     assert fake_user_service.user_exists_called_once()
     assert fake_user_service.user_exists_called_once_with(signup_data['email'], fake_session)
     assert fake_user_service.create_user_called_once()
-    assert fake_user_service.create_user_called_once_with(user_data, fake_session)
\ No newline at end of file
+    assert fake_user_service.create_user_called_once_with(user_data, fake_session)
+
+def test_token_decoded_once_per_request(monkeypatch):
+    calls = {"decode": 0, "blocklist": 0}
+
+    def fake_decode(token):
+        calls["decode"] += 1
+        return {"jti": "jti-1", "refresh": False, "user": {"email": "yuki@gmail.com"}}
+
+    async def fake_in_blocklist(jti):
+        calls["blocklist"] += 1
+        return False
+
+    monkeypatch.setattr(dependencies, "decode_token", fake_decode)
+    monkeypatch.setattr(dependencies, "token_in_blocklist", fake_in_blocklist)
+
+    app = FastAPI()
+
+    @app.get("/")
+    async def route(first=Depends(AccessTokenBearer()), second=Depends(AccessTokenBearer())):
+        return {"same": first == second}
+
+    response = TestClient(app).get("/", headers={"Authorization": "Bearer token"})
+
+    assert response.json() == {"same": True}
+    assert calls == {"decode": 1, "blocklist": 1}
+
+
+def test_principal_cache_lru_and_invalidation():
+    cache = PrincipalCache(ttl=60, maxsize=2)
+
+    first = UserPrincipalModel(uid=uuid.uuid4(), email="a@gmail.com", role="user", is_verified=True)
+    second = UserPrincipalModel(uid=uuid.uuid4(), email="b@gmail.com", role="user", is_verified=True)
+
+    cache.set("jti-1", first)
+    cache.set("jti-2", second)
+    cache.get("jti-1")
+    cache.set("jti-3", first)
+
+    assert cache.get("jti-2") is None
+    assert cache.get("jti-1") == first
+
+    cache.invalidate_user(first.uid)
+
+    assert len(cache) == 0
+
+    cache.ttl = 0
+    cache.set("jti-4", second)
+
+    assert cache.get("jti-4") is None
+
+
+def test_password_hash_pool_rejects_when_saturated():
+    pool = PasswordHashPool(workers=1, max_pending=1)
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0)
+
+        with pytest.raises(PasswordHashingUnavailable):
+            await pool.run(time.sleep, 0)
+
+        await first
+
+    asyncio.run(scenario())
+    pool.shutdown()
+
+    assert pool.pending == 0
+
+
+def test_deleting_an_already_deleted_account_is_not_found(test_client, monkeypatch):
+    # A principal still cached after another worker deleted the user
+    principal = UserPrincipalModel(uid=uuid.uuid4(), email="gone@example.com", role="user", is_verified=True)
+    delete_user = AsyncMock()
+
+    monkeypatch.setitem(app.dependency_overrides, dependencies.get_current_user, lambda: principal)
+    monkeypatch.setattr(auth_routes.user_service, "get_user_by_email", AsyncMock(return_value=None))
+    monkeypatch.setattr(auth_routes.user_service, "delete_user", delete_user)
+
+    response = test_client.delete(f"http://localhost{auth_prefix}/delete-account")
+
+    assert response.status_code == 404
+    delete_user.assert_not_awaited()
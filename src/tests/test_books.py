@@ -1,5 +1,52 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import Request
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src import app
+from src.books import routes as book_routes
+from src.books.bulk import iter_csv_rows, iter_ndjson_rows
+from src.books.cache import BookDetailCache
+from src.books.schemas import Book as BookSchema
+from src.books.search import to_prefix_tsquery
+from src.books.search_index import BookSearchIndex
+from src.books.service import BookService
+from src.conditional import http_date, is_not_modified, make_etag
+from src.db import redis as redis_cache
+from src.db.main import DATABASE_URL, get_session
+from src.db.models import Book, BookTag, Review, Tag, User
+from src.errors import InvalidCursor
+from src.pagination import cursor_order, decode_cursor, encode_cursor
+from src.reviews import service as review_service_module
+from src.reviews.schemas import ReviewCreateModel
+from src.reviews.service import REVIEW_SORT_COLUMNS, ReviewService
+from src.tags import service as tag_service_module
+from src.tags.schemas import TagCreateModel
+from src.tags.service import TagService
+
 book_prefix = f"api/v1/books"
 
+@pytest.fixture
+def signed_in_client(test_client):
+    app.dependency_overrides[book_routes.access_token_bearer] = lambda: {"user": {"user_uid": "u"}}
+    app.dependency_overrides[book_routes.role_checker.dependency] = lambda: True
+
+    yield test_client
+
+    del app.dependency_overrides[book_routes.access_token_bearer]
+    del app.dependency_overrides[book_routes.role_checker.dependency]
+
+
 def test_get_all_books(test_client, fake_book_service, fake_session):
     response = test_client.get(
         url=f"{book_prefix}"
@@ -7,3 +54,584 @@ def test_get_all_books(test_client, fake_book_service, fake_session):
 
     assert fake_book_service.get_all_books_called_once()
     assert fake_book_service.get_all_books_called_once_with(fake_session)
+
+
+def test_book_cursor_round_trip():
+    values = [datetime(2025, 8, 16, 17, 3, 9, 121941), uuid.uuid4()]
+
+    cursor = encode_cursor(values)
+
+    assert decode_cursor(cursor, [Book.created_at, Book.uid]) == values
+
+
+def test_book_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", [Book.created_at, Book.uid])
+
+    # Well-formed JSON with slots of the wrong type
+    for values in (["2025-01-01T00:00:00", {}], [{}, str(uuid.uuid4())], [1, [2]]):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(values), [Book.created_at, Book.uid])
+
+
+def test_tampered_cursor_is_a_bad_request(signed_in_client, monkeypatch):
+    session = AsyncMock()
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: session)
+
+    cursor = encode_cursor(["2025-01-01T00:00:00", {}], cursor_order([Book.created_at, Book.uid]))
+
+    response = signed_in_client.get(f"http://localhost/{book_prefix}", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    session.exec.assert_not_awaited()
+
+
+def test_review_cursor_is_bound_to_its_sort_order():
+    created_at = REVIEW_SORT_COLUMNS["created_at"]
+    newest_first = encode_cursor([datetime(2025, 8, 16, 17, 3, 9), uuid.uuid4()],
+                                 cursor_order(created_at, descending=True))
+
+    # Same columns, other direction
+    with pytest.raises(InvalidCursor):
+        decode_cursor(newest_first, created_at, cursor_order(created_at, descending=False))
+
+    # Another sort with as many columns
+    by_rating = encode_cursor([4, uuid.uuid4()], cursor_order([Review.rating, Review.uid]))
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(by_rating, created_at, cursor_order(created_at))
+
+    session = AsyncMock()
+
+    with pytest.raises(InvalidCursor):
+        asyncio.run(ReviewService().get_book_reviews(uuid.uuid4(), session, cursor=newest_first,
+                                                     descending=False))
+
+    session.exec.assert_not_awaited()
+    assert len(decode_cursor(newest_first, created_at, cursor_order(created_at))) == 2
+
+
+def test_search_text_becomes_prefix_terms_only():
+    assert to_prefix_tsquery("The Great  Gats") == "the:* & great:* & gats:*"
+    assert to_prefix_tsquery("O'Brien & !x | y:*") == "o:* & brien:* & x:* & y:*"
+    assert to_prefix_tsquery(" !&| ") is None
+
+
+def test_search_index_ranks_filters_and_survives_compaction():
+    index = BookSearchIndex()
+
+    def book(title, author="Someone", language="English", pages=100):
+        return SimpleNamespace(uid=uuid.uuid4(), title=title, author=author, publisher="Press",
+                               publisher_date=date(2000, 1, 1), page_count=pages, language=language)
+
+    gatsby = book("The Great Gatsby", "F. Scott Fitzgerald", pages=180)
+    expectations = book("Great Expectations", "Charles Dickens", pages=544)
+    french = book("Gatsby le Magnifique", "F. Scott Fitzgerald", language="French")
+
+    for b in (gatsby, expectations, french):
+        index.add(b)
+
+    assert set(index.search("fitz gats")[0]) == {gatsby.uid, french.uid}
+    assert index.search("gre", min_pages=200)[0] == [expectations.uid]
+    assert index.search("gatsby", language="French")[0] == [french.uid]
+
+    first, cursor = index.search("great", limit=1)
+    second, last_cursor = index.search("great", limit=1, cursor=cursor)
+    assert len(first) == len(second) == 1 and first != second and last_cursor is None
+
+    index.add(SimpleNamespace(**{**vars(gatsby), "title": "The Beautiful and Damned"}))
+    index.remove(expectations.uid)
+    index.compact()
+
+    assert len(index) == 2
+    assert index.search("great")[0] == []
+    assert index.search("damned")[0] == [gatsby.uid]
+
+
+def test_search_index_leaves_out_rows_it_cannot_store():
+    index = BookSearchIndex()
+
+    good = SimpleNamespace(uid=uuid.uuid4(), title="Dune", author="Frank Herbert", publisher="Chilton",
+                           publisher_date=date(1965, 8, 1), page_count=412, language="English")
+    index.add(good)
+
+    # A stale negative page count replacing the indexed version drops it
+    index.add(SimpleNamespace(**{**vars(good), "page_count": -1}))
+    index.add(SimpleNamespace(**{**vars(good), "uid": uuid.uuid4(), "page_count": 2 ** 40}))
+
+    assert len(index) == 0
+    assert len(index._page_counts) == len(index._lengths) == len(index._alive) == 1
+
+    index.add(good)
+
+    assert index.search("dune", min_pages=400)[0] == [good.uid]
+
+
+def test_tag_filter_requires_every_tag_only_in_all_mode():
+    session = AsyncMock()
+    session.exec.return_value = MagicMock()
+
+    def compiled(tag_mode):
+        asyncio.run(BookService().get_all_books(session, tags=["Fantasy", "fantasy", "Classic"],
+                                                tag_mode=tag_mode))
+
+        return str(session.exec.call_args.args[0].compile(compile_kwargs={"literal_binds": True}))
+
+    all_sql, any_sql = compiled("all"), compiled("any")
+
+    assert "HAVING count(*) = 2" in all_sql
+    assert "HAVING" not in any_sql and "booktag" in any_sql
+
+
+def test_import_books_reports_bad_rows_without_aborting_batch():
+    body = (
+        b'title,author,publisher,publisher_date,page_count,language\n'
+        b'"Anne, of Green\nGables",L. M. Montgomery,L. C. Page,1908-06-13,320,English\n'
+        b'1984,George Orwell,Secker & Warburg,not-a-date,328,English\n'
+        b'Dune,Frank Herbert,Chilton,1965-08-01,412,English'
+    )
+
+    async def chunks():
+        for i in range(0, len(body), 7):
+            yield body[i:i + 7]
+
+    session = AsyncMock()
+
+    report = asyncio.run(BookService().import_books(
+        iter_csv_rows(chunks()), str(uuid.uuid4()), session, batch_size=1
+    ))
+
+    assert report["inserted"] == 2
+    assert report["failed"] == 1
+    assert report["errors"][0]["row"] == 4
+    assert session.commit.await_count == 2
+
+
+def test_import_reports_undecodable_lines_and_carries_on():
+    body = (
+        b'{"title": "Dune", "author": "Frank Herbert", "publisher": "Chilton", '
+        b'"publisher_date": "1965-08-01", "page_count": 412, "language": "English"}\n'
+        b'{"title": "\xff\xfe"}\n'
+        b'{"title": "Emma", "author": "Jane Austen", "publisher": "John Murray", '
+        b'"publisher_date": "1815-12-23", "page_count": 474, "language": "English"}\n'
+    )
+
+    async def chunks():
+        yield body
+
+    report = asyncio.run(BookService().import_books(
+        iter_ndjson_rows(chunks()), str(uuid.uuid4()), AsyncMock(), batch_size=10
+    ))
+
+    assert report["inserted"] == 2
+    assert report["errors"] == [{"row": 2, "error": "invalid UTF-8 at byte 11"}]
+
+
+def test_import_retries_a_failed_batch_row_by_row():
+    rows = [
+        (n, {"title": title, "author": "A", "publisher": "P", "publisher_date": "2001-01-01",
+             "page_count": 100, "language": "English"})
+        for n, title in enumerate(["One", "Two", "Three"], start=2)
+    ]
+
+    async def aiter_rows():
+        for row in rows:
+            yield row
+
+    rejected = IntegrityError("INSERT", {}, Exception("duplicate key"))
+
+    session = AsyncMock()
+    session.begin_nested = MagicMock()
+    # The batch insert fails, then so does only the second row alone
+    session.execute.side_effect = [rejected, None, rejected, None]
+
+    report = asyncio.run(BookService().import_books(
+        aiter_rows(), str(uuid.uuid4()), session, batch_size=10
+    ))
+
+    assert report["inserted"] == 2
+    assert report["errors"] == [{"row": 3, "error": "IntegrityError"}]
+    assert session.begin_nested.call_count == 3
+    assert session.rollback.await_count == 1
+
+
+def test_book_detail_cache_collapses_concurrent_misses(monkeypatch):
+    store = {}
+    loads = []
+
+    async def cache_get_entry(key):
+        return store.get(key)
+
+    async def cache_set_entry(key, entry, ttl):
+        store[key] = {k: v if k == "body" else v.encode() for k, v in entry.items()}
+
+    async def acquire_lock(key, ttl_ms):
+        return "token"
+
+    async def release_lock(key, token):
+        pass
+
+    for name, fake in [("cache_get_entry", cache_get_entry), ("cache_set_entry", cache_set_entry),
+                       ("acquire_lock", acquire_lock), ("release_lock", release_lock)]:
+        monkeypatch.setattr(redis_cache, name, fake)
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return {"body": b'{"title": "Dune"}', "etag": '"abc"'}
+
+    async def scenario():
+        cache = BookDetailCache(ttl=60)
+
+        bodies = await asyncio.gather(*[cache.get_or_load("uid", loader) for _ in range(10)])
+
+        return bodies + [await cache.get_or_load("uid", loader)]
+
+    bodies = asyncio.run(scenario())
+
+    assert all(body == {"body": b'{"title": "Dune"}', "etag": '"abc"'} for body in bodies)
+    assert len(loads) == 1
+
+
+def test_book_detail_cache_falls_back_when_redis_is_down(monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise RedisConnectionError("redis is down")
+
+    for name in ["cache_get_entry", "cache_set_entry", "acquire_lock", "release_lock"]:
+        monkeypatch.setattr(redis_cache, name, unavailable)
+
+    async def loader():
+        return {"body": b"{}"}
+
+    assert asyncio.run(BookDetailCache(ttl=60).get_or_load("uid", loader)) == {"body": b"{}"}
+
+
+
+def test_shared_book_detail_load_uses_its_own_session(signed_in_client, monkeypatch):
+    own_session = MagicMock()
+    loaded_with = []
+
+    class OwnSession:
+        async def __aenter__(self):
+            return own_session
+
+        async def __aexit__(self, *exc):
+            return False
+
+    async def get_book_detail(book_uid, session, reviews_limit):
+        loaded_with.append(session)
+        return SimpleNamespace(model_dump_json=lambda: '{"title": "Dune"}',
+                               updated_at=datetime(2025, 8, 16))
+
+    async def miss(*args, **kwargs):
+        return None
+
+    for name in ["cache_get_entry", "cache_set_entry", "acquire_lock", "release_lock"]:
+        monkeypatch.setattr(redis_cache, name, miss)
+
+    monkeypatch.setattr(book_routes, "async_session", OwnSession)
+    monkeypatch.setattr(book_routes.book_service, "get_book_detail", get_book_detail)
+
+    response = signed_in_client.get(f"http://localhost/{book_prefix}/{uuid.uuid4()}")
+
+    assert response.status_code == 200
+    assert response.json() == {"title": "Dune"}
+    assert loaded_with == [own_session]
+
+
+def catalog_book(title: str) -> Book:
+    return Book(uid=uuid.uuid4(), title=title, author="A", publisher="P", publisher_date=date(2000, 1, 1),
+                page_count=100, language="English", created_at=datetime(2025, 8, 16),
+                updated_at=datetime(2025, 8, 16))
+
+
+def test_batch_get_keeps_request_order_and_reports_missing_uids(signed_in_client, monkeypatch):
+    first, second = catalog_book("First"), catalog_book("Second")
+    gone, never = uuid.uuid4(), uuid.uuid4()
+
+    session = AsyncMock()
+    session.exec.return_value = [first, second]
+
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: session)
+
+    uids = [second.uid, gone, first.uid, second.uid, never]
+
+    response = signed_in_client.post(f"http://localhost/{book_prefix}/batch-get",
+                                     json={"uids": [str(uid) for uid in uids]})
+
+    assert response.status_code == 200
+
+    body = response.json()
+
+    # Each book once, in request order; reviews and tags only when included
+    assert [book["title"] for book in body["books"]] == ["Second", "First"]
+    assert body["missing"] == [str(gone), str(never)]
+    assert all(book["reviews"] is None and book["tags"] is None for book in body["books"])
+
+    statement, = (call.args[0] for call in session.exec.await_args_list)
+
+    assert statement.compile().params["uid_1"] == [second.uid, gone, first.uid, never]
+
+
+def test_batch_get_embeds_the_latest_reviews_when_included(signed_in_client, monkeypatch):
+    book = catalog_book("Reviewed")
+    review = Review(uid=uuid.uuid4(), rating=4, review_text="Good", book_uid=book.uid,
+                    created_at=datetime(2025, 8, 16), updated_at=datetime(2025, 8, 16))
+
+    session = AsyncMock()
+    session.exec.side_effect = [[book], [review]]
+
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: session)
+
+    response = signed_in_client.post(f"http://localhost/{book_prefix}/batch-get", json={
+        "uids": [str(book.uid)], "include": ["reviews"], "reviews_limit": 2,
+    })
+
+    assert response.status_code == 200
+
+    item, = response.json()["books"]
+
+    assert [r["uid"] for r in item["reviews"]] == [str(review.uid)]
+    assert item["tags"] is None
+
+    _, reviews_statement = (call.args[0] for call in session.exec.await_args_list)
+
+    assert reviews_statement.compile().params["position_1"] == 2
+
+
+def test_avg_rating_is_null_without_reviews_and_rounded_to_two_places():
+    book = dict(uid=uuid.uuid4(), title="Dune", author="Frank Herbert", publisher="Chilton",
+                publisher_date=date(1965, 8, 1), page_count=412, language="English",
+                created_at=datetime(2025, 8, 16), updated_at=datetime(2025, 8, 16))
+
+    assert BookSchema(**book).avg_rating is None
+    assert BookSchema(**book, review_count=3, rating_sum=13).avg_rating == 4.33
+
+    dumped = BookSchema(**book, review_count=3, rating_sum=13).model_dump()
+
+    assert dumped["avg_rating"] == 4.33 and "rating_sum" not in dumped
+
+
+def test_adding_a_review_counts_it_and_its_rating(monkeypatch):
+    book = Book(uid=uuid.uuid4(), title="Dune", author="Frank Herbert", publisher="Chilton",
+                publisher_date=date(1965, 8, 1), page_count=412, language="English")
+    adjust = AsyncMock()
+
+    monkeypatch.setattr(review_service_module.book_service, "get_book", AsyncMock(return_value=book))
+    monkeypatch.setattr(review_service_module.book_service, "adjust_rating_aggregates", adjust)
+    monkeypatch.setattr(review_service_module.user_service, "get_user_by_email",
+                        AsyncMock(return_value=User(username="r", email="r@example.com", first_name="R",
+                                                    last_name="R", password_hash="x")))
+    monkeypatch.setattr(review_service_module.book_detail_cache, "invalidate", AsyncMock())
+
+    session = AsyncMock()
+    session.add = MagicMock()
+
+    asyncio.run(ReviewService().add_review_to_book(
+        "r@example.com", str(book.uid), ReviewCreateModel(rating=4, review_text="Good"), session
+    ))
+
+    adjust.assert_awaited_once_with(book.uid, 1, 4, session)
+    session.commit.assert_awaited_once()
+
+
+@asynccontextmanager
+async def book_in_rolled_back_transaction():
+    """A session on DATABASE_URL holding one new book, all rolled back after.
+
+    Skips the test when the database is unreachable.
+    """
+
+    engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+
+    try:
+        connection = await engine.connect()
+    except Exception as e:
+        await engine.dispose()
+        pytest.skip(f"database unavailable: {e}")
+
+    transaction = await connection.begin()
+    session = AsyncSession(bind=connection, expire_on_commit=False,
+                           join_transaction_mode="create_savepoint")
+
+    try:
+        user = User(username="book-tests", email="book-tests@example.com", first_name="B",
+                    last_name="T", password_hash="x", is_verified=True)
+        session.add(user)
+        await session.flush()
+
+        book = Book(title="Rated", author="A", publisher="P", publisher_date=date(2000, 1, 1),
+                    page_count=100, language="English", user_uid=user.uid)
+        session.add(book)
+        await session.flush()
+
+        yield session, book
+
+    finally:
+        await session.close()
+        await transaction.rollback()
+        await connection.close()
+        await engine.dispose()
+
+
+async def apply_rating_deltas(deltas) -> list:
+    async with book_in_rolled_back_transaction() as (session, book):
+        aggregates = []
+
+        for count_delta, rating_delta in deltas:
+            await BookService().adjust_rating_aggregates(book.uid, count_delta, rating_delta, session)
+            await session.refresh(book)
+
+            aggregates.append((book.review_count, book.rating_sum,
+                               BookSchema.model_validate(book, from_attributes=True).avg_rating))
+
+        return aggregates
+
+
+def test_rating_aggregates_follow_review_adds_edits_and_deletes():
+    aggregates = asyncio.run(apply_rating_deltas([
+        (1, 4),   # add a 4
+        (1, 5),   # add a 5
+        (0, -2),  # edit the 4 into a 2: only the sum moves
+        (-1, -5), # delete the 5
+        (-1, -2), # delete the 2
+    ]))
+
+    assert aggregates == [(1, 4, 4.0), (2, 9, 4.5), (2, 7, 3.5), (1, 2, 2.0), (0, 0, None)]
+
+
+async def page_through_reviews() -> dict:
+    async with book_in_rolled_back_transaction() as (session, book):
+        # Shared timestamps and ratings, so the uid tiebreak matters
+        reviews = [
+            Review(uid=uuid.uuid4(), rating=i % 3, review_text=f"Review {i}", book_uid=book.uid,
+                   created_at=datetime(2025, 8, 1 + i // 2), updated_at=datetime(2025, 8, 16))
+            for i in range(7)
+        ]
+        session.add_all(reviews)
+        await session.flush()
+
+        service = ReviewService()
+        seen = {}
+
+        detail = await BookService().get_book_detail(book.uid, session, reviews_limit=3)
+        rest = await service.get_book_reviews(book.uid, session, cursor=detail.reviews_next_cursor)
+
+        seen["detail"] = [r.uid for r in detail.reviews] + [r.uid for r in rest.items]
+
+        for sort in REVIEW_SORT_COLUMNS:
+            for descending in (True, False):
+                uids, cursor = [], None
+
+                while True:
+                    page = await service.get_book_reviews(book.uid, session, limit=2, cursor=cursor,
+                                                          sort=sort, descending=descending)
+                    uids += [r.uid for r in page.items]
+                    cursor = page.next_cursor
+
+                    if cursor is None:
+                        break
+
+                seen[(sort, descending)] = uids
+
+        expected = {
+            (sort, descending): [r.uid for r in sorted(
+                reviews, reverse=descending,
+                key=lambda r: tuple(getattr(r, c.key) for c in REVIEW_SORT_COLUMNS[sort]),
+            )]
+            for sort in REVIEW_SORT_COLUMNS for descending in (True, False)
+        }
+
+        return seen, expected
+
+
+def test_review_pages_follow_their_sort_order_and_continue_from_book_detail():
+    seen, expected = asyncio.run(page_through_reviews())
+
+    # The book detail's latest reviews plus the page its cursor leads to
+    # are the full newest-first list, without gaps or repeats
+    assert seen.pop("detail") == expected[("created_at", True)]
+    assert seen == expected
+
+
+async def rename_and_delete_a_tag(invalidate) -> list:
+    async with book_in_rolled_back_transaction() as (session, book):
+        tag = Tag(name=f"renamed-tag-{uuid.uuid4().hex}")
+        session.add(tag)
+        await session.flush()
+
+        session.add(BookTag(book_id=book.uid, tag_id=tag.uid))
+        book.updated_at = datetime(2025, 8, 16)
+        await session.commit()
+
+        service, details, book_uid = TagService(), [], book.uid
+
+        await service.update_tag(tag.uid, TagCreateModel(name="Renamed"), session)
+
+        detail = await BookService().get_book_detail(book.uid, session)
+        details.append(([t.name for t in detail.tags], detail.updated_at > datetime(2025, 8, 16)))
+
+        book.updated_at = datetime(2025, 8, 16)
+        await session.commit()
+
+        await service.delete_tag(tag.uid, session)
+
+        session.expire_all()
+        detail = await BookService().get_book_detail(book_uid, session)
+        details.append(([t.name for t in detail.tags], detail.updated_at > datetime(2025, 8, 16)))
+
+        return book_uid, details
+
+
+def test_renaming_or_deleting_a_tag_refreshes_its_books(monkeypatch):
+    invalidate = AsyncMock()
+    monkeypatch.setattr(tag_service_module.book_detail_cache, "invalidate", invalidate)
+
+    book_uid, details = asyncio.run(rename_and_delete_a_tag(invalidate))
+
+    # New validators and no cached detail after each change
+    assert details == [(["Renamed"], True), ([], True)]
+    assert [call.args for call in invalidate.await_args_list] == [(book_uid,), (book_uid,)]
+
+
+def test_only_the_default_book_detail_is_cached(signed_in_client, fake_session, monkeypatch):
+    get_or_load = AsyncMock(return_value={"body": b"{}", "etag": '"e"', "last_modified": "x"})
+    get_book_detail = AsyncMock(return_value=SimpleNamespace(
+        model_dump_json=lambda: "{}", updated_at=datetime(2025, 8, 16)))
+
+    monkeypatch.setattr(book_routes.book_detail_cache, "get_or_load", get_or_load)
+    monkeypatch.setattr(book_routes.book_service, "get_book_detail", get_book_detail)
+
+    book_uid = uuid.uuid4()
+    # Any spelling of the uid shares the entry invalidate() deletes
+    url = f"http://localhost/{book_prefix}/{str(book_uid).upper()}"
+
+    assert signed_in_client.get(url).status_code == 200
+    assert get_or_load.await_count == 1 and get_book_detail.await_count == 0
+    assert get_or_load.await_args.args[0] == str(book_uid)
+
+    assert signed_in_client.get(url, params={"reviews_limit": 2}).status_code == 200
+    assert get_or_load.await_count == 1
+    assert get_book_detail.await_args.args[1] is fake_session
+    assert get_book_detail.await_args.kwargs == {"reviews_limit": 2}
+
+
+def test_conditional_get_validators():
+    etag = make_etag(["uid", datetime(2025, 8, 16)])
+    last_modified = http_date(datetime(2025, 8, 16, 12, 0, 0))
+
+    def request(**headers):
+        return Request({"type": "http", "headers": [
+            (k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()
+        ]})
+
+    assert is_not_modified(request(if_none_match=f'"other", W/{etag}'), etag)
+    assert not is_not_modified(request(if_none_match='"other"'), etag)
+    assert is_not_modified(request(if_modified_since=last_modified), etag, last_modified)
+    assert not is_not_modified(
+        request(if_modified_since="Fri, 15 Aug 2025 12:00:00 GMT"), etag, last_modified
+    )
+    # If-None-Match wins over If-Modified-Since
+    assert not is_not_modified(
+        request(if_none_match='"other"', if_modified_since=last_modified), etag, last_modified
+    )
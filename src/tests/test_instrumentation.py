@@ -0,0 +1,32 @@
+from sqlalchemy import create_engine, text
+
+from src.db.instrumentation import instrument_engine, start_query_stats
+
+
+def test_engine_events_count_statements_of_the_current_request():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    stats = start_query_stats()
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+
+    assert stats.count == 2
+    assert stats.duration > 0
+
+
+def test_responses_carry_server_timing(test_client):
+    response = test_client.get("http://localhost/api/v1/does-not-exist")
+
+    assert response.headers["server-timing"].startswith('db;dur=0.00;desc="0 queries", app;dur=')
+
+
+def test_metrics_endpoint_exports_http_latency_by_route_template(test_client):
+    test_client.get("http://localhost/api/v1/books/not-a-real-uid")
+
+    body = test_client.get("http://localhost/metrics").text
+
+    assert 'route="GET /api/v1/books/{book_uid}"' in body
+    assert "bookly_http_requests_in_progress" in body
@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from aiosmtplib import SMTPRecipientRefused, SMTPRecipientsRefused, SMTPServerDisconnected
+
+from src import celery_tasks
+from src.mail import EMAIL_TEMPLATES, SMTPConnection, SMTPPool, build_email, render_email
+
+
+def test_send_many_retries_transient_failures_on_a_new_connection():
+    refused = SMTPRecipientsRefused([SMTPRecipientRefused(550, "no such user", "x@example.com")])
+    outcomes = iter([None, SMTPServerDisconnected("gone"), None, refused, None])
+    connections = []
+
+    async def send_message(message):
+        outcome = next(outcomes)
+
+        if outcome is not None:
+            raise outcome
+
+    async def connect():
+        smtp = MagicMock(is_connected=True, send_message=send_message, quit=AsyncMock())
+        connections.append(smtp)
+        return SMTPConnection(smtp)
+
+    pool = SMTPPool(size=1)
+    pool._connect = connect
+
+    messages = [build_email([f"reader{i}@example.com"], "Hi", "<p>Hi</p>") for i in range(4)]
+
+    errors = asyncio.run(pool.send_many(messages, attempts=2, backoff=0))
+
+    # The dropped connection was replaced; the rejected recipient kept the session
+    assert errors == [None, None, refused, None]
+    assert len(connections) == 2
+    assert pool._idle[0].smtp is connections[1] and pool._idle[0].sent == 2
+
+
+def test_templates_render_with_escaped_context():
+    for template_id in EMAIL_TEMPLATES:
+        render_email(template_id, {"link": "http://localhost"})
+
+    subject, body = render_email("password_reset", {"link": "http://localhost/reset?a=1&b=2"})
+
+    assert subject == "📚 Reset Your Password"
+    assert 'href="http://localhost/reset?a=1&amp;b=2"' in body
+
+
+def test_queue_email_stages_only_the_template_id_and_context():
+    session = MagicMock()
+
+    celery_tasks.queue_email(session, ["reader@example.com"], "verify_email", link="http://localhost/verify/t")
+
+    message, = session.add.call_args.args
+
+    assert message.task == celery_tasks.send_template_email.name
+    assert message.args == [["reader@example.com"], "verify_email", {"link": "http://localhost/verify/t"}]
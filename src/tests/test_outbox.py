@@ -0,0 +1,110 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.sql.dml import Delete, Update
+
+from src import celery_tasks, outbox
+from src.config import Config
+
+
+def outbox_session(rows):
+    session = AsyncMock()
+    session.exec.return_value = MagicMock(all=MagicMock(return_value=rows))
+
+    return session
+
+
+def statements(session, kind):
+    return [call.args[0] for call in session.execute.await_args_list if isinstance(call.args[0], kind)]
+
+
+def ids_of(statement):
+    ids, = (value for value in statement.compile().params.values() if isinstance(value, list))
+
+    return ids
+
+
+def test_relay_deletes_published_rows_and_backs_off_failed_ones():
+    rows = [SimpleNamespace(id=i) for i in (1, 2, 3)]
+    session = outbox_session(rows)
+
+    def publish(messages):
+        assert messages == rows
+        return {2: KeyError("src.celery_tasks.gone")}
+
+    assert asyncio.run(outbox.relay_batch(session, publish, batch_size=3)) == 2
+
+    delete, = statements(session, Delete)
+    update, = statements(session, Update)
+    params = update.compile().params
+
+    assert ids_of(delete) == [1, 3]
+    assert ids_of(update) == [2]
+    assert params["last_error"] == "'src.celery_tasks.gone'"
+    # attempts + 1, and available_at = now() + backoff * 2 ** least(attempts, 6)
+    assert params["attempts_1"] == 1
+    assert params["least_1"] == outbox.MAX_BACKOFF_EXPONENT
+    session.commit.assert_awaited_once()
+
+
+def test_relay_backs_off_the_whole_batch_when_publish_raises():
+    rows = [SimpleNamespace(id=i) for i in (1, 2)]
+    session = outbox_session(rows)
+
+    def publish(messages):
+        raise ConnectionError("broker down")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(outbox.relay_batch(session, publish))
+
+    update, = statements(session, Update)
+
+    assert ids_of(update) == [1, 2]
+    assert update.compile().params["last_error"] == "broker down"
+    assert not statements(session, Delete)
+    session.commit.assert_awaited_once()
+
+
+def test_drain_stops_at_the_first_short_batch(monkeypatch):
+    counts = iter([2, 2, 1, 2])
+    sessions = []
+
+    async def relay_batch(session, publish, batch_size):
+        sessions.append(session)
+        return next(counts)
+
+    monkeypatch.setattr(outbox, "relay_batch", relay_batch)
+
+    session_maker = MagicMock()
+
+    assert asyncio.run(outbox.drain_outbox(session_maker, None, batch_size=2, max_batches=10)) == 5
+    assert session_maker.call_count == 3
+
+
+def test_publish_groups_emails_and_fails_only_the_bad_rows(monkeypatch):
+    published = []
+
+    def enqueue(task, *args):
+        published.append((task.name, args))
+
+    monkeypatch.setattr(celery_tasks, "enqueue", enqueue)
+    monkeypatch.setattr(Config, "OUTBOX_EMAILS_PER_TASK", 2)
+
+    email = celery_tasks.send_template_email.name
+    messages = [
+        SimpleNamespace(id=i, task=email, args=[[f"reader{i}@example.com"], "welcome", {}])
+        for i in range(1, 6)
+    ] + [
+        SimpleNamespace(id=6, task="src.celery_tasks.gone", args=[]),
+        SimpleNamespace(id=7, task=celery_tasks.send_email.name, args=[["a@example.com"], "Hi", "Hi"]),
+    ]
+
+    failed = celery_tasks.publish_outbox(messages)
+
+    assert list(failed) == [6]
+    assert isinstance(failed[6], KeyError)
+    assert [len(args[0]) for name, args in published if name == celery_tasks.send_email_batch.name] == [2, 2, 1]
+    assert published[0][1][0][0] == {"recipients": ["reader1@example.com"], "template": "welcome", "context": {}}
+    assert published[-1] == (celery_tasks.send_email.name, (["a@example.com"], "Hi", "Hi"))
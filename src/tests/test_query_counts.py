@@ -0,0 +1,130 @@
+"""Pin the number of SQL statements behind each endpoint's queries.
+
+Relationships are loaded per endpoint (see src.db.loading), so a count going
+up here means something started loading more of the object graph. Runs
+against the database in DATABASE_URL inside a rolled back transaction and is
+skipped when that database is unreachable.
+"""
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth.service import UserService
+from src.books.service import BookService
+from src.db.main import DATABASE_URL
+from src.db.models import Book, BookTag, Review, Tag, User
+from src.reviews.service import ReviewService
+from src.tags.service import TagService
+
+
+async def seed(session: AsyncSession) -> dict:
+    user = User(username="counter", email="query-counts@example.com", first_name="Q",
+                last_name="C", password_hash="x", is_verified=True)
+    session.add(user)
+    await session.flush()
+
+    books = [
+        Book(title=f"Book {i}", author="A", publisher="P", publisher_date=date(2000, 1, 1),
+             page_count=100, language="English", user_uid=user.uid)
+        for i in range(3)
+    ]
+    tags = [Tag(name=f"query-count-tag-{i}") for i in range(3)]
+    session.add_all(books + tags)
+    await session.flush()
+
+    for book in books:
+        session.add_all([BookTag(book_id=book.uid, tag_id=tag.uid) for tag in tags])
+        session.add_all([
+            Review(rating=i, review_text="ok", book_uid=book.uid, user_uid=user.uid)
+            for i in range(3)
+        ])
+
+    await session.flush()
+
+    session.expunge_all()
+
+    return {"email": user.email, "book_uid": books[0].uid, "tag_uid": tags[0].uid,
+            "book_uids": [book.uid for book in books]}
+
+
+async def count_statements() -> dict:
+    engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    try:
+        connection = await engine.connect()
+    except Exception as e:
+        await engine.dispose()
+        pytest.skip(f"database unavailable: {e}")
+
+    transaction = await connection.begin()
+
+    session = AsyncSession(bind=connection, expire_on_commit=False,
+                           join_transaction_mode="create_savepoint")
+
+    try:
+        ids = await seed(session)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+
+        async def count(query) -> int:
+            statements.clear()
+            await query
+            session.expunge_all()
+            return len(statements)
+
+        return {
+            "GET /books": await count(BookService().get_all_books(session)),
+            "GET /books?tag=": await count(BookService().get_all_books(
+                session, tags=["query-count-tag-0", "query-count-tag-1"])),
+            "GET /books/{uid}": await count(BookService().get_book_detail(ids["book_uid"], session)),
+            "POST /books/batch-get": await count(BookService().get_books_by_uids(ids["book_uids"], session)),
+            "POST /books/batch-get (reviews, tags)": await count(BookService().get_books_by_uids(
+                ids["book_uids"], session, include=["reviews", "tags"])),
+            "PATCH /books/{uid} (lookup)": await count(BookService().get_book(ids["book_uid"], session)),
+            "GET /reviews/book/{uid}": await count(ReviewService().get_book_reviews(ids["book_uid"], session)),
+            "GET /tags": await count(TagService().get_tags(session)),
+            "PUT /tags/{uid} (lookup)": await count(TagService().get_tag_by_uid(ids["tag_uid"], session)),
+            "POST /auth/login (lookup)": await count(UserService().get_user_by_email(ids["email"], session)),
+            "GET /auth/me": await count(UserService().get_user_by_email(
+                ids["email"], session, load=[User.books, User.reviews])),
+        }
+
+    finally:
+        if event.contains(engine.sync_engine, "before_cursor_execute", record):
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+        await session.close()
+        await transaction.rollback()
+        await connection.close()
+        await engine.dispose()
+
+
+def test_statements_per_endpoint():
+    counts = asyncio.run(count_statements())
+
+    assert counts == {
+        "GET /books": 1,
+        "GET /books?tag=": 1,
+        # book, its tags, its latest reviews
+        "GET /books/{uid}": 3,
+        "POST /books/batch-get": 1,
+        # books, their tags, their latest reviews
+        "POST /books/batch-get (reviews, tags)": 3,
+        "PATCH /books/{uid} (lookup)": 1,
+        "GET /reviews/book/{uid}": 1,
+        "GET /tags": 1,
+        "PUT /tags/{uid} (lookup)": 1,
+        "POST /auth/login (lookup)": 1,
+        # user, their books, their reviews
+        "GET /auth/me": 3,
+    }
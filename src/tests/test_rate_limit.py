@@ -0,0 +1,120 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from src.auth.rate_limit import AUTH_RATE_LIMITS, AuthRateLimiter, LocalPrefilter, Rate
+from src.config import Config
+from src.errors import RateLimitExceeded
+
+
+def fake_request(ip: str):
+    return SimpleNamespace(client=SimpleNamespace(host=ip), state=SimpleNamespace())
+
+
+def test_prefilter_rejects_floods_and_redis_errors_fail_open():
+    unreachable = redis.from_url("redis://127.0.0.1:1")
+    limiter = AuthRateLimiter(enabled=True, prefilter=LocalPrefilter(Rate(2, 60), maxsize=10),
+                              redis_client=unreachable)
+    request = fake_request("198.51.100.1")
+
+    async def flood():
+        for _ in range(2):
+            await limiter.check(request, "send_mail")
+
+        with pytest.raises(RateLimitExceeded) as rejected:
+            await limiter.check(request, "send_mail")
+
+        await unreachable.aclose()
+
+        return rejected.value
+
+    rejected = asyncio.run(flood())
+
+    assert rejected.headers["Retry-After"] == "1"
+    assert rejected.headers["RateLimit-Remaining"] == "0"
+
+
+def test_account_bucket_rejects_without_charging_the_ip_bucket():
+    ip = f"test-{uuid.uuid4().hex}"
+    account = f"{uuid.uuid4().hex}@example.com"
+    burst = AUTH_RATE_LIMITS["login"]["account_ip"].burst
+
+    async def attempts():
+        client = redis.from_url(Config.REDIS_URL)
+        limiter = AuthRateLimiter(enabled=True, redis_client=client)
+
+        try:
+            await client.ping()
+        except (RedisError, OSError) as e:
+            await client.aclose()
+            pytest.skip(f"redis unavailable: {e}")
+
+        try:
+            for _ in range(burst):
+                await limiter.check(fake_request(ip), "login", account=account)
+
+            with pytest.raises(RateLimitExceeded) as rejected:
+                await limiter.check(fake_request(ip), "login", account=account)
+
+            # Same IP, another account: only the allowed attempts were charged
+            request = fake_request(ip)
+            await limiter.check(request, "login", account=f"other-{account}")
+
+            ip_key, _ = limiter._buckets("login", ip, None)[0]
+            ip_tokens = float(await client.hget(ip_key, "tokens"))
+
+            return rejected.value, request.state.rate_limit, ip_tokens
+
+        finally:
+            keys = [key for other in (account, f"other-{account}")
+                    for key, _ in limiter._buckets("login", ip, other)]
+            await client.delete(*keys)
+            await client.aclose()
+
+    rejected, state, ip_tokens = asyncio.run(attempts())
+
+    assert int(rejected.headers["Retry-After"]) > 0
+    assert (state.limit, state.remaining) == (burst, burst - 1)
+    assert int(ip_tokens) == AUTH_RATE_LIMITS["login"]["ip"].burst - burst - 1
+
+
+def test_draining_an_account_from_one_ip_leaves_its_owner_able_to_log_in():
+    attacker, owner = (f"test-{uuid.uuid4().hex}" for _ in range(2))
+    account = f"{uuid.uuid4().hex}@example.com"
+    burst = AUTH_RATE_LIMITS["login"]["account_ip"].burst
+
+    async def attempts():
+        client = redis.from_url(Config.REDIS_URL)
+        limiter = AuthRateLimiter(enabled=True, redis_client=client)
+
+        try:
+            await client.ping()
+        except (RedisError, OSError) as e:
+            await client.aclose()
+            pytest.skip(f"redis unavailable: {e}")
+
+        try:
+            for _ in range(burst):
+                await limiter.check(fake_request(attacker), "login", account=account)
+
+            with pytest.raises(RateLimitExceeded):
+                await limiter.check(fake_request(attacker), "login", account=account)
+
+            # The owner's attempt reaches the password check
+            request = fake_request(owner)
+            await limiter.check(request, "login", account=account)
+
+            return request.state.rate_limit
+
+        finally:
+            keys = [key for ip in (attacker, owner) for key, _ in limiter._buckets("login", ip, account)]
+            await client.delete(*keys)
+            await client.aclose()
+
+    state = asyncio.run(attempts())
+
+    assert (state.limit, state.remaining) == (burst, burst - 1)